@@ -0,0 +1,149 @@
+"""
+Allocation budgets for the search hot path
+
+    python -m benchmarks.allocations [--depth 3] [--seed 0]
+
+Counts the memory allocated by each component on the benchmark suite's fixed
+positions, in bytes and in allocated blocks (about one per object), and
+divides it by the work done:
+
+    minimax            per searched node
+    get_valid_moves    per generated move
+    simulate_move      per simulated move (the board is released afterwards)
+    evaluate           per evaluation_features call
+
+tracemalloc and the interpreter's block count are read on every Python and C
+call and return, and only increases are added up, so short-lived objects
+count too, not just what is still alive at the end. Every component runs once
+before it is measured, so the Board pool and other caches are already warm.
+The results are checked against BUDGETS and the exit status is 1 when any
+component allocates more than its budget, so a change that brings allocations
+back fails instead of quietly adding garbage collector work.
+"""
+import argparse
+import sys
+import tracemalloc
+from checkers.constants import WHITE, BLACK
+from minimax.algorithm import minimax, evaluation_features, simulate_move, SearchInfo, EVAL_CACHE
+from .suite import PHASES
+
+SEARCH_DEPTH = 3
+# (bytes, blocks) allowed per unit of work, about 20% above the values measured on CPython 3.11
+# at the default depth and seed; lower them when a change cuts allocations
+BUDGETS = {
+    'minimax': (77000, 500),
+    'get_valid_moves': (2800, 17),
+    'simulate_move': (11000, 100),
+    'evaluate': (56000, 340),
+}
+
+
+class AllocationCounter:
+    """Context manager adding up the increases in traced memory and allocated blocks between calls"""
+
+    def __init__(self):
+        self.bytes = self.blocks = 0
+        self.last_bytes = self.last_blocks = 0
+
+    def _hook(self, frame, event, arg):
+        # Reading once per event keeps the hook's own temporaries out of the counts:
+        # they are created after the reading and freed before the next one
+        current, blocks = tracemalloc.get_traced_memory()[0], sys.getallocatedblocks()
+        if current > self.last_bytes:
+            self.bytes += current - self.last_bytes
+        if blocks > self.last_blocks:
+            self.blocks += blocks - self.last_blocks
+        self.last_bytes, self.last_blocks = current, blocks
+
+    def __enter__(self):
+        tracemalloc.start()
+        self.last_bytes, self.last_blocks = tracemalloc.get_traced_memory()[0], sys.getallocatedblocks()
+        sys.setprofile(self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        sys.setprofile(None)
+        self._hook(None, None, None)
+        tracemalloc.stop()
+
+
+def run_minimax(positions, depth=SEARCH_DEPTH):
+    nodes = 0
+    for board, turn in positions:
+        EVAL_CACHE.clear()
+        info = SearchInfo()
+        board = board.copy()
+        minimax(board, depth, turn == WHITE, None, info=info)
+        board.release()
+        nodes += info.nodes
+    return nodes
+
+
+def run_valid_moves(positions):
+    moves = 0
+    for board, _ in positions:
+        for piece in board.get_all_pieces(WHITE) + board.get_all_pieces(BLACK):
+            moves += len(board.get_valid_moves(piece))
+    return moves
+
+
+def run_simulate_move(positions):
+    moves = 0
+    for board, turn in positions:
+        for piece in board.get_all_pieces(turn):
+            for destination, skip in board.get_valid_moves(piece).items():
+                simulate_move(piece, destination, board, None, skip).release()
+                moves += 1
+    return moves
+
+
+def run_evaluate(positions):
+    for board, _ in positions:
+        evaluation_features(board)
+    return len(positions)
+
+
+COMPONENTS = {
+    'minimax': run_minimax,
+    'get_valid_moves': run_valid_moves,
+    'simulate_move': run_simulate_move,
+    'evaluate': run_evaluate,
+}
+
+
+def measure(run, positions):
+    """Returns (bytes, blocks) allocated per unit of work returned by run(positions)"""
+    run(positions)
+    with AllocationCounter() as counter:
+        units = run(positions)
+    return counter.bytes / units, counter.blocks / units
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the allocations of the search hot path against budgets')
+    parser.add_argument('--depth', type=int, default=SEARCH_DEPTH, help='minimax search depth')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the benchmark positions')
+    args = parser.parse_args(argv)
+
+    positions = [position for build in PHASES.values() for position in build(args.seed)]
+    over = []
+    for name, run in COMPONENTS.items():
+        if name == 'minimax':
+            allocated, blocks = measure(lambda boards: run(boards, args.depth), positions)
+        else:
+            allocated, blocks = measure(run, positions)
+        budget_bytes, budget_blocks = BUDGETS[name]
+        flag = ''
+        if allocated > budget_bytes or blocks > budget_blocks:
+            flag = '  OVER BUDGET'
+            over.append(name)
+        print(f"{name:16} {allocated:10.0f} bytes {blocks:7.1f} blocks  "
+              f"(budget {budget_bytes} bytes, {budget_blocks} blocks){flag}")
+
+    if over:
+        print(f"Over the allocation budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
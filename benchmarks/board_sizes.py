@@ -0,0 +1,86 @@
+"""
+Move generation and search throughput per board size
+
+    python -m benchmarks.board_sizes [--sizes 8 10 12] [--positions 20] [--depth 3] [--seed 0]
+
+Samples positions by playing random moves from the start position of each
+board size, then times get_ordered_moves (move generation only), get_all_moves
+(move generation plus building every child board) and a fixed-depth minimax
+search from each position, reporting moves and nodes per second.
+"""
+import argparse
+import random
+import time
+from checkers.board import Board
+from checkers.constants import WHITE, BLACK, BOARD_SIZES
+from minimax.algorithm import minimax, get_all_moves, get_ordered_moves, SearchInfo, EVAL_CACHE
+
+# Random plies played from the start to reach each sampled position
+MIN_PLIES, MAX_PLIES = 4, 30
+# Move generation is repeated this many times per position so the timings are not all noise
+MOVEGEN_REPEATS = 20
+
+
+def sample_positions(size, count, rng):
+    """Returns up to count (board, turn) pairs reached by random play on a size x size board"""
+    positions = []
+    while len(positions) < count:
+        board, turn = Board(size), BLACK
+        for _ in range(rng.randint(MIN_PLIES, MAX_PLIES)):
+            moves = get_all_moves(board, turn, None)
+            if not moves:
+                break
+            board = rng.choice(moves)
+            turn = WHITE if turn == BLACK else BLACK
+        if get_ordered_moves(board, turn):
+            positions.append((board, turn))
+    return positions
+
+
+def bench_size(size, positions, depth):
+    """Returns (moves/s from get_ordered_moves, moves/s from get_all_moves, search nodes/s) for one board size"""
+    moves = 0
+    started = time.perf_counter()
+    for _ in range(MOVEGEN_REPEATS):
+        for board, turn in positions:
+            moves += len(get_ordered_moves(board, turn))
+    ordered_rate = moves / (time.perf_counter() - started)
+
+    moves = 0
+    started = time.perf_counter()
+    for board, turn in positions:
+        children = get_all_moves(board, turn, None)
+        moves += len(children)
+        for child in children:
+            child.release()
+    simulated_rate = moves / (time.perf_counter() - started)
+
+    # Every size starts with a cold cache, so cache hits don't favour the later sizes
+    EVAL_CACHE.clear()
+    nodes = 0
+    started = time.perf_counter()
+    for board, turn in positions:
+        info = SearchInfo()
+        minimax(board, depth, turn == WHITE, None, info=info)
+        nodes += info.nodes
+    search_rate = nodes / (time.perf_counter() - started)
+    return ordered_rate, simulated_rate, search_rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark move generation and search per board size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BOARD_SIZES), choices=BOARD_SIZES)
+    parser.add_argument('--positions', type=int, default=20, help='positions sampled per board size')
+    parser.add_argument('--depth', type=int, default=3, help='minimax search depth')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>6} {'movegen/s':>12} {'moves+copy/s':>13} {'nodes/s':>10}")
+    for size in args.sizes:
+        positions = sample_positions(size, args.positions, random.Random(args.seed))
+        ordered_rate, simulated_rate, search_rate = bench_size(size, positions, args.depth)
+        print(f"{f'{size}x{size}':>6} {ordered_rate:12.0f} {simulated_rate:13.0f} {search_rate:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Performance regression suite for the search and its hot paths
+
+    python -m benchmarks.suite [--save baseline.json] [--compare baseline.json] [--threshold 0.1] [--raw]
+
+Builds fixed, seeded positions for three phases of the game (opening, a
+middlegame with most element powers still unused, and a king endgame) and
+times each component on every phase:
+
+    minimax            fixed-depth search from each position (nodes = nodes searched)
+    evaluate           evaluation_features, the uncached part of evaluate()
+    get_valid_moves    move generation for every piece of both sides
+    simulate_move      building the board after every legal move
+
+Each measurement is repeated and the fastest run kept. --save writes the
+results, the positions (as FEN) and the machine to a JSON baseline; --compare
+reports the change in rate against a baseline and exits with status 1 when any
+component got slower than the threshold allows. A short pure-Python loop is
+timed alongside, and rates are normalized by it before comparing (--raw turns
+that off), so a machine that is busier or throttled as a whole is not reported
+as a regression everywhere. A minimax node count that
+differs from the baseline means the search itself changed, so it is reported
+alongside the timings.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+from datetime import date
+from checkers.board import Board
+from checkers.constants import WHITE, BLACK, ELEMENTS
+from checkers.piece import Piece
+from checkers.record import to_fen
+from minimax.algorithm import (minimax, evaluation_features, get_all_moves, simulate_move, SearchInfo,
+                               EVAL_CACHE)
+
+POSITIONS_PER_PHASE = 8
+SEARCH_DEPTH = 5
+# Calls per position for the components that take microseconds
+FAST_REPEATS = 200
+REPEATS = 5
+# Slowdown (fraction of the baseline rate) reported as a regression
+THRESHOLD = 0.10
+# Iterations of the pure-Python loop that measures how fast the machine is running right now
+CALIBRATION_LOOPS = 200000
+
+
+def _random_plies(board, turn, plies, rng, choose=None):
+    """Plays random moves (or choose(moves)) and returns the position reached"""
+    for _ in range(plies):
+        moves = get_all_moves(board, turn, None)
+        if not moves:
+            break
+        board = choose(moves) if choose else rng.choice(moves)
+        turn = WHITE if turn == BLACK else BLACK
+    return board, turn
+
+
+def _unused_powers(board):
+    return sum(1 for row in board.board for piece in row if piece != 0 and piece.can_use_power())
+
+
+def opening_positions(seed):
+    rng = random.Random(seed)
+    positions = []
+    for index in range(POSITIONS_PER_PHASE):
+        random.seed(seed + index)  # Board() deals the elements from the global generator
+        positions.append(_random_plies(Board(), BLACK, rng.randint(2, 8), rng))
+    return positions
+
+
+def middlegame_positions(seed):
+    """Positions after 14-24 plies of moves chosen to keep as many powers unused as possible"""
+    rng = random.Random(seed)
+    positions = []
+    for index in range(POSITIONS_PER_PHASE):
+        random.seed(seed + index)
+
+        def keep_powers(moves):
+            most = max(_unused_powers(move) for move in moves)
+            return rng.choice([move for move in moves if _unused_powers(move) == most])
+
+        positions.append(_random_plies(Board(), BLACK, rng.randint(14, 24), rng, keep_powers))
+    return positions
+
+
+def endgame_positions(seed):
+    """Two or three kings a side plus up to two men with powers, on random squares"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < POSITIONS_PER_PHASE:
+        board = Board()
+        board.clear()
+        squares = [(row, col) for row in range(board.rows) for col in range((row + 1) % 2, board.cols, 2)]
+        rng.shuffle(squares)
+        for color in (WHITE, BLACK):
+            for king in [True] * rng.randint(2, 3) + [False] * rng.randint(0, 2):
+                row, col = squares.pop()
+                # Men may not stand on the row they would promote on
+                if not king and row == (board.rows - 1 if color == WHITE else 0):
+                    continue
+                piece = Piece(row, col, color)
+                if king:
+                    piece.king = piece.power_used = True
+                else:
+                    piece.set_element(rng.choice(ELEMENTS))
+                board.place(piece)
+        turn = rng.choice((WHITE, BLACK))
+        if board.winner() is None:
+            positions.append((board, turn))
+    return positions
+
+
+PHASES = {
+    'opening': opening_positions,
+    'middlegame': middlegame_positions,
+    'endgame': endgame_positions,
+}
+
+
+def _best_of(repeats, run):
+    """Runs run() repeats times and returns (fastest seconds, ops of that run)"""
+    best = None
+    for _ in range(repeats):
+        # Collector pauses land wherever the heap happens to fill up, so keep them out of the timings
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            ops = run()
+            seconds = time.perf_counter() - started
+        finally:
+            gc.enable()
+        if best is None or seconds < best[0]:
+            best = (seconds, ops)
+    return best
+
+
+def _calibration_loop():
+    total = 0
+    for index in range(CALIBRATION_LOOPS):
+        total += index % 7
+    return CALIBRATION_LOOPS
+
+
+def bench_minimax(positions, depth=SEARCH_DEPTH):
+    nodes = 0
+    for board, turn in positions:
+        # A cold evaluation cache for every search keeps runs comparable
+        EVAL_CACHE.clear()
+        info = SearchInfo()
+        minimax(board.copy(), depth, turn == WHITE, None, info=info)
+        nodes += info.nodes
+    return nodes
+
+
+def bench_evaluate(positions):
+    for _ in range(FAST_REPEATS):
+        for board, _ in positions:
+            evaluation_features(board)
+    return FAST_REPEATS * len(positions)
+
+
+def bench_valid_moves(positions):
+    calls = 0
+    for _ in range(FAST_REPEATS):
+        for board, _ in positions:
+            for piece in board.get_all_pieces(WHITE) + board.get_all_pieces(BLACK):
+                board.get_valid_moves(piece)
+                calls += 1
+    return calls
+
+
+def bench_simulate_move(positions):
+    moves = 0
+    for _ in range(FAST_REPEATS // 5):
+        for board, turn in positions:
+            for piece in board.get_all_pieces(turn):
+                for destination, skip in board.get_valid_moves(piece).items():
+                    simulate_move(piece, destination, board, None, skip).release()
+                    moves += 1
+    return moves
+
+
+COMPONENTS = {
+    'minimax': bench_minimax,
+    'evaluate': bench_evaluate,
+    'get_valid_moves': bench_valid_moves,
+    'simulate_move': bench_simulate_move,
+}
+
+
+def run_suite(seed=0, repeats=REPEATS, components=tuple(COMPONENTS)):
+    """
+    Returns {'positions': {phase: [FEN]}, 'calibration': seconds,
+             'results': {'component/phase': {seconds, ops, rate}}}
+    """
+    positions = {phase: build(seed) for phase, build in PHASES.items()}
+    results = {}
+    calibration = float('inf')
+    for component in components:
+        for phase, phase_positions in positions.items():
+            seconds, ops = _best_of(repeats, lambda: COMPONENTS[component](phase_positions))
+            results[f"{component}/{phase}"] = {'seconds': round(seconds, 6), 'ops': ops,
+                                               'rate': round(ops / seconds, 1)}
+            # Calibrating between measurements samples the machine's speed across the whole run
+            calibration = min(calibration, _best_of(repeats, _calibration_loop)[0])
+    fens = {phase: [to_fen(board, turn) for board, turn in phase_positions]
+            for phase, phase_positions in positions.items()}
+    return {'positions': fens, 'calibration': round(calibration, 6), 'results': results}
+
+
+def compare(current, baseline, threshold=THRESHOLD, normalize=True):
+    """
+    Prints the change against a baseline and returns the names of the components that regressed
+    With normalize, rates are scaled by the calibration loop first, so a machine that is slower or
+    busier as a whole does not show up as a regression of every component
+    """
+    if current['positions'] != baseline['positions']:
+        print('Warning: the benchmark positions differ from the baseline')
+    scale = 1.0
+    if normalize and current.get('calibration') and baseline.get('calibration'):
+        scale = current['calibration'] / baseline['calibration']
+        print(f"Machine speed {1 / scale * 100:.0f}% of the baseline run; rates are normalized")
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:28} {result['rate']:12.1f}/s  (not in baseline)")
+            continue
+        change = result['rate'] * scale / old['rate'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        if name.startswith('minimax/') and result['ops'] != old['ops']:
+            flag += f"  nodes {old['ops']} -> {result['ops']}"
+        print(f"{name:28} {result['rate']:12.1f}/s  {change * 100:+6.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the search and its hot paths')
+    parser.add_argument('--save', help='write the results to this JSON baseline')
+    parser.add_argument('--compare', help='compare the results with this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown (fraction of the baseline rate) that counts as a regression')
+    parser.add_argument('--raw', action='store_true',
+                        help='compare raw rates instead of normalizing by the calibration loop')
+    parser.add_argument('--repeat', type=int, default=REPEATS, help='runs per measurement (the fastest is kept)')
+    parser.add_argument('--only', nargs='+', choices=list(COMPONENTS), default=list(COMPONENTS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.seed, args.repeat, args.only)
+    current['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                          'processor': platform.processor(), 'date': date.today().isoformat()}
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold, not args.raw)
+    else:
+        regressions = []
+        for name, result in current['results'].items():
+            print(f"{name:28} {result['rate']:12.1f}/s  {result['ops']:8} ops in {result['seconds']:.3f}s")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+            file.write('\n')
+        print(f"Wrote {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Headless frame-time benchmark of the game UI with scripted input
+
+    python -m benchmarks.ui_frames [--games 3] [--plies 60] [--size 8] [--seed 0]
+
+Runs main.main() under SDL's dummy video driver, so no display is needed. The
+input is planned ahead on a Game built with the same random seed (and so the
+same elements): Human vs Human is picked in the menu, then whole games are
+played by clicks, including fire double-clicks, earth power dialog answers,
+the help screen and restarts. main.wait_for_events hands the loop one scripted
+event per call and main.FrameTimer is swapped for one that keeps every frame.
+
+Two passes run in fresh processes: one for frame times, one under tracemalloc
+for the memory allocated while drawing each frame (the peak above the memory
+in use when the frame started). The games main.py records are compared with
+the planned ones, so a script that went out of sync is reported instead of
+being measured.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import pygame
+from checkers.constants import WIDTH, BOARD_HEIGHT, BOARD_SIZES
+from checkers.game import Game
+from checkers.record import read_records, format_move
+
+# Plies between visits to the help screen
+HELP_EVERY = 10
+# Chance of playing a fire capture or a capture of an earth piece when one is available
+POWER_CHANCE = 0.7
+PERCENTILES = (50, 90, 99)
+
+
+def _click(pos):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+
+def _key(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode='')
+
+
+def _square_center(board, square):
+    row, col = square
+    size = board.square_size
+    return col * size + size // 2, row * size + size // 2
+
+
+def _earth_button(use_power):
+    """Center of the Yes or No button of Game.draw_earth_power_dialog"""
+    dialog_width, dialog_height = 400, 200
+    dialog_x = (WIDTH - dialog_width) // 2
+    dialog_y = (BOARD_HEIGHT - dialog_height) // 2
+    third = 1 if use_power else 2
+    return dialog_x + third * dialog_width // 3, dialog_y + 160
+
+
+def _is_power_move(game, start, end):
+    """Whether a move is a fire capture or a capture that will ask about earth power"""
+    if start == end:
+        return True
+    skipped = (game.valid_moves if game.capture_continues else game.legal_moves()[start])[end]
+    return bool(skipped) and not isinstance(skipped[0], str) and skipped[0].element_power == 'earth' \
+        and not skipped[0].power_used
+
+
+def plan(games, plies, size, seed):
+    """
+    Returns (events, move texts per game) for playing games of up to plies plies by clicks
+
+    Seeds random first, as run_pass must do again before main.main() builds its boards.
+    """
+    random.seed(seed)
+    rng = random.Random(seed)
+    # Cycle the board size button, then pick Human vs Human
+    events = [_click((WIDTH // 2, 415))] * BOARD_SIZES.index(size) + [_click((WIDTH // 2, 345))]
+    games_played = []
+    game = Game(None, size)
+    for number in range(games):
+        if number:
+            events.append(_key(pygame.K_r))
+            game.reset()
+        for ply in range(plies):
+            if game.winner() is not None:
+                break
+            if ply % HELP_EVERY == HELP_EVERY - 1:
+                events += [_key(pygame.K_h), _key(pygame.K_h)]
+
+            moves = game.selectable_moves()
+            power_moves = [move for move in moves if _is_power_move(game, *move)]
+            start, end = rng.choice(power_moves if power_moves and rng.random() < POWER_CHANCE else moves)
+            if start == end:
+                # Select the fire piece, then click it twice more
+                events += [_click(_square_center(game.board, start))] * 3
+            elif game.capture_continues:
+                events.append(_click(_square_center(game.board, end)))
+            else:
+                events += [_click(_square_center(game.board, start)), _click(_square_center(game.board, end))]
+            game.play(start, end)
+
+            if game.earth_power_active:
+                use_power = rng.random() < 0.5
+                events.append(_click(_earth_button(use_power)))
+                game.handle_earth_power_choice(use_power)
+        games_played.append([format_move(move) for move in game.record.moves])
+    events.append(_key(pygame.K_ESCAPE))
+    return events, games_played
+
+
+def run_pass(games, plies, size, seed, allocations):
+    """Plays the script through main.main() and returns ([(seconds, allocated bytes or None)], in sync)"""
+    # Imported here: main opens its window on import
+    import main as ui
+
+    script, planned = plan(games, plies, size, seed)
+    events = iter(script)
+    frames = []
+
+    class RecordingFrameTimer(ui.FrameTimer):
+        def start(self):
+            if allocations:
+                tracemalloc.reset_peak()
+                self.base = tracemalloc.get_traced_memory()[0]
+            super().start()
+
+        def stop(self):
+            seconds = time.perf_counter() - self.frame_started
+            allocated = tracemalloc.get_traced_memory()[1] - self.base if allocations else None
+            frames.append((seconds, allocated))
+            self.record(seconds)
+
+        def report(self):
+            pass
+
+    with tempfile.TemporaryDirectory() as directory:
+        ui.RECORD_FILE = os.path.join(directory, 'games.pdn')
+        ui.FrameTimer = RecordingFrameTimer
+        ui.wait_for_events = lambda timeout: [next(events, pygame.event.Event(pygame.QUIT))]
+
+        random.seed(seed)
+        if allocations:
+            tracemalloc.start()
+        try:
+            ui.main()
+        except SystemExit:
+            pass
+        finally:
+            tracemalloc.stop()
+
+        played = [[format_move(move) for move in record.moves] for record in read_records(ui.RECORD_FILE)]
+    return frames, played == planned
+
+
+def _report(label, values, unit, scale):
+    # Inclusive quantiles stay within the measured values, even for short runs
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    columns = [f"mean {statistics.fmean(values) * scale:8.2f}"]
+    columns += [f"p{percentile} {cuts[percentile - 1] * scale:8.2f}" for percentile in PERCENTILES]
+    columns.append(f"max {max(values) * scale:8.2f}")
+    print(f"{label:>16} ({unit}): " + '  '.join(columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark UI frame times with scripted input')
+    parser.add_argument('--games', type=int, default=3)
+    parser.add_argument('--plies', type=int, default=60, help='most plies played per game')
+    parser.add_argument('--size', type=int, default=8, choices=BOARD_SIZES, help='board size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-allocations', action='store_true', help='skip the tracemalloc pass')
+    args = parser.parse_args(argv)
+
+    # Each pass gets a fresh process: main.main() shuts pygame down when it exits
+    context = multiprocessing.get_context('spawn')
+    passes = [False] if args.no_allocations else [False, True]
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        results = [pool.apply(run_pass, (args.games, args.plies, args.size, args.seed, allocations))
+                   for allocations in passes]
+
+    for frames, in_sync in results:
+        if not in_sync:
+            raise SystemExit('The scripted input went out of sync with the game; results not reported')
+
+    timings = results[0][0]
+    print(f"{len(timings)} frames, {args.size}x{args.size} board")
+    _report('frame time', [seconds for seconds, _ in timings], 'ms', 1000)
+    if len(results) > 1:
+        _report('allocated/frame', [allocated for _, allocated in results[1][0]], 'KiB', 1 / 1024)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,111 @@
 import pygame
 import random
-from .constants import ROWS, COLS, SQUARE_SIZE, WHITE, BLACK, CREAM, BROWN, ELEMENTS
+from .constants import ROWS, BOARD_HEIGHT, BOARD_SIZES, WHITE, BLACK, CREAM, BROWN, ELEMENTS
 from .piece import Piece
 
+# Boards released by the search, reused by Board.copy
+_pool = []
+
 
 class Board:
-    def __init__(self):
+    def __init__(self, size=ROWS):
+        if size not in BOARD_SIZES:
+            raise ValueError(f"unsupported board size {size}")
+        self.rows = self.cols = size
         self.board = []
-        self.white_left = self.red_left = 12  # Keeping variable names for compatibility
+        self.white_left = self.red_left = 0  # Keeping variable names for compatibility
         self.white_kings = self.black_kings = 0
         self.create_board()
         self.pending_earth_power = None  # Store info when earth power is triggered
 
+    @property
+    def square_size(self):
+        """Side of one square in pixels when the board fills the board area of the window"""
+        return BOARD_HEIGHT // self.cols
+
     def draw_squares(self, win):
         win.fill(CREAM)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(win, BROWN, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        size = self.square_size
+        for row in range(self.rows):
+            for col in range(row % 2, self.cols, 2):
+                pygame.draw.rect(win, BROWN, (col * size, row * size, size, size))
 
     def create_board(self):
-        for row in range(ROWS):
+        # Each side starts on all but the two middle rows: 3 rows on 8x8, 4 on 10x10, 5 on 12x12
+        starting_rows = (self.rows - 2) // 2
+        for row in range(self.rows):
             self.board.append([])
-            for col in range(COLS):
+            for col in range(self.cols):
                 if col % 2 == ((row + 1) % 2):
-                    if row < 3:
+                    if row < starting_rows:
                         piece = Piece(row, col, WHITE)
                         # Assign random elemental power
                         piece.set_element(random.choice(ELEMENTS))
                         self.board[row].append(piece)
-                    elif row > 4:
+                        self.white_left += 1
+                    elif row >= self.rows - starting_rows:
                         piece = Piece(row, col, BLACK)
                         # Assign random elemental power
                         piece.set_element(random.choice(ELEMENTS))
                         self.board[row].append(piece)
+                        self.red_left += 1
                     else:
                         self.board[row].append(0)
                 else:
                     self.board[row].append(0)
 
+    def clear(self):
+        """Removes every piece from the board"""
+        self.board = [[0] * self.cols for _ in range(self.rows)]
+        self.white_left = self.red_left = 0
+        self.white_kings = self.black_kings = 0
+        self.pending_earth_power = None
+
+    def place(self, piece):
+        """Puts a piece on its square and updates the piece and king counts"""
+        self.board[piece.row][piece.col] = piece
+        if piece.color == BLACK:
+            self.red_left += 1
+            if piece.king:
+                self.black_kings += 1
+        else:
+            self.white_left += 1
+            if piece.king:
+                self.white_kings += 1
+
+    def copy(self):
+        """Returns an independent copy of the board, reusing released boards and pieces when available"""
+        try:
+            board = _pool.pop()
+        except IndexError:  # Also covers another search thread taking the last one
+            board = Board.__new__(Board)
+        board.rows, board.cols = self.rows, self.cols
+        board.board = [[square if square == 0 else square.copy() for square in row] for row in self.board]
+        board.white_left = self.white_left
+        board.red_left = self.red_left
+        board.white_kings = self.white_kings
+        board.black_kings = self.black_kings
+
+        board.pending_earth_power = None
+        if self.pending_earth_power:
+            captor, captured = self.pending_earth_power['captor'], self.pending_earth_power['captured']
+            board.pending_earth_power = {
+                'captor': board.board[captor.row][captor.col],
+                'captured': board.board[captured.row][captured.col],
+                'destination': self.pending_earth_power['destination']
+            }
+        return board
+
+    def release(self):
+        """Hands the board and its pieces back for reuse by copy(); it must not be used afterwards"""
+        for row in self.board:
+            for piece in row:
+                if piece != 0:
+                    piece.release()
+        self.board = None
+        self.pending_earth_power = None
+        _pool.append(self)
+
     def get_all_pieces(self, color):
         pieces = []
         for row in self.board:
@@ -51,27 +119,31 @@ class Board:
         self.board[piece.row][piece.col] = 0
         piece.move(row, col)
 
-        # Check if piece should be promoted to king
-        if (row == 0 and piece.color == BLACK) or (row == ROWS - 1 and piece.color == WHITE):
-            piece.make_king()
-            if piece.color == WHITE:
-                self.white_kings += 1
-            else:
-                self.black_kings += 1
+        # Check if piece should be promoted to king (kings coming back to the last row stay counted once)
+        if not piece.king and ((row == 0 and piece.color == BLACK) or (row == self.rows - 1 and piece.color == WHITE)):
+            self.crown(piece)
 
         self.board[row][col] = piece
 
+    def crown(self, piece):
+        """Promotes a piece to king and updates the king counts"""
+        piece.make_king()
+        if piece.color == WHITE:
+            self.white_kings += 1
+        else:
+            self.black_kings += 1
+
     def draw(self, win):
         self.draw_squares(win)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
+        size = self.square_size
+        for row in self.board:
+            for piece in row:
                 if piece != 0:
-                    piece.draw(win)
+                    piece.draw(win, size)
 
     def get_piece(self, row, col):
         """Returns the piece at a given position"""
-        if 0 <= row < ROWS and 0 <= col < COLS:
+        if 0 <= row < self.rows and 0 <= col < self.cols:
             return self.board[row][col]
         return None
 
@@ -146,7 +218,7 @@ class Board:
                     if step == -1:
                         row = -1  # Allow kings to go all the way up
                     else:
-                        row = ROWS  # Allow kings to go all the way down
+                        row = self.rows  # Allow kings to go all the way down
                     moves.update(self._traverse_left(r + step, row, step, color, left - 1, skipped=last))
                     moves.update(self._traverse_right(r + step, row, step, color, left + 1, skipped=last))
                 break
@@ -177,7 +249,7 @@ class Board:
             condition = lambda r: r < stop
 
         r = start
-        while condition(r) and right < COLS:
+        while condition(r) and right < self.cols:
             current = self.board[r][right]
 
             # Empty square
@@ -197,7 +269,7 @@ class Board:
                     if step == -1:
                         row = -1
                     else:
-                        row = ROWS
+                        row = self.rows
                     moves.update(self._traverse_left(r + step, row, step, color, right - 1, skipped=last))
                     moves.update(self._traverse_right(r + step, row, step, color, right + 1, skipped=last))
                 break
@@ -225,23 +297,23 @@ class Board:
             # Kings can move in all 4 diagonal directions
             moves.update(self._traverse_left(row - 1, -1, -1, piece.color, left))  # Up-left
             moves.update(self._traverse_right(row - 1, -1, -1, piece.color, right))  # Up-right
-            moves.update(self._traverse_left(row + 1, ROWS, 1, piece.color, left))  # Down-left
-            moves.update(self._traverse_right(row + 1, ROWS, 1, piece.color, right))  # Down-right
+            moves.update(self._traverse_left(row + 1, self.rows, 1, piece.color, left))  # Down-left
+            moves.update(self._traverse_right(row + 1, self.rows, 1, piece.color, right))  # Down-right
         else:
             # Regular pieces can only move in their direction
             if piece.color == BLACK:
                 moves.update(self._traverse_left(row - 1, max(row - 3, -1), -1, piece.color, left))
                 moves.update(self._traverse_right(row - 1, max(row - 3, -1), -1, piece.color, right))
             if piece.color == WHITE:
-                moves.update(self._traverse_left(row + 1, min(row + 3, ROWS), 1, piece.color, left))
-                moves.update(self._traverse_right(row + 1, min(row + 3, ROWS), 1, piece.color, right))
+                moves.update(self._traverse_left(row + 1, min(row + 3, self.rows), 1, piece.color, left))
+                moves.update(self._traverse_right(row + 1, min(row + 3, self.rows), 1, piece.color, right))
             
             # Special case for water power - allow backward movement
             if piece.element_power == 'water' and not piece.power_used:
                 # Add backward moves for water element
                 if piece.color == BLACK:
-                    moves.update(self._traverse_left(row + 1, min(row + 2, ROWS), 1, piece.color, left, is_water_move=True))
-                    moves.update(self._traverse_right(row + 1, min(row + 2, ROWS), 1, piece.color, right, is_water_move=True))
+                    moves.update(self._traverse_left(row + 1, min(row + 2, self.rows), 1, piece.color, left, is_water_move=True))
+                    moves.update(self._traverse_right(row + 1, min(row + 2, self.rows), 1, piece.color, right, is_water_move=True))
                 else:  # WHITE
                     moves.update(self._traverse_left(row - 1, max(row - 2, -1), -1, piece.color, left, is_water_move=True))
                     moves.update(self._traverse_right(row - 1, max(row - 2, -1), -1, piece.color, right, is_water_move=True))
@@ -269,7 +341,7 @@ class Board:
         # Check all adjacent squares for opponent pieces
         for dr, dc in directions:
             r, c = piece.row + dr, piece.col + dc
-            if 0 <= r < ROWS and 0 <= c < COLS:
+            if 0 <= r < self.rows and 0 <= c < self.cols:
                 target = self.board[r][c]
                 if target != 0 and target.color != piece.color:
                     # Fire power allows capturing without moving
@@ -292,7 +364,7 @@ class Board:
                 r, c = piece.row + dr, piece.col + dc
                 
                 # Check if the destination is on the board and empty
-                if 0 <= r < ROWS and 0 <= c < COLS and self.board[r][c] == 0:
+                if 0 <= r < self.rows and 0 <= c < self.cols and self.board[r][c] == 0:
                     # For regular pieces, respect direction constraints
                     if (piece.color == BLACK and dr < 0) or (piece.color == WHITE and dr > 0) or piece.king:
                         air_moves[(r, c)] = []  # No pieces are captured in this special move
@@ -322,9 +394,7 @@ class Board:
             captured.use_power()
             
             # Move the captor to the destination (jumping over the earth piece)
-            self.board[captor.row][captor.col] = 0
-            captor.move(dest_row, dest_col)
-            self.board[dest_row][dest_col] = captor
+            self.move(captor, dest_row, dest_col)
             
             # No capture happens - earth piece remains in place
             result = True
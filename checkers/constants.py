@@ -5,7 +5,9 @@ BOARD_HEIGHT = 620
 INFO_HEIGHT = 80
 HEIGHT = BOARD_HEIGHT + INFO_HEIGHT
 
-ROWS, COLS = 8, 8
+ROWS, COLS = 8, 8  # Default board size
+# Supported board sizes: 8x8, 10x10 (international) and 12x12
+BOARD_SIZES = (8, 10, 12)
 SQUARE_SIZE = BOARD_HEIGHT//COLS
 
 # rgb
@@ -30,3 +32,6 @@ AIR = pygame.transform.scale(pygame.image.load('assets/air.png'), (44, 25))
 EARTH = pygame.transform.scale(pygame.image.load('assets/earth.png'), (44, 25))
 
 ELEMENTS = ['fire', 'water', 'air', 'earth']
+
+# Game.winner() result for a drawn game
+DRAW = 'draw'
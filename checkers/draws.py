@@ -0,0 +1,86 @@
+"""
+Draw rules: repetition and no progress
+
+PositionHistory keeps the Zobrist hash of every position since the game began
+(with the side to move) and where the current run of reversible moves started.
+Captures, men moving, promotions and used powers can never be undone, so no
+earlier position can come back after one of them.
+"""
+from .zobrist import PIECE_KEYS, piece_state, position_hash
+
+# A game is drawn when the same position occurs this many times with the same side to move
+REPETITION_LIMIT = 3
+# ... or after this many plies without a capture, a man moving or a power being used
+NO_PROGRESS_LIMIT = 80
+
+
+def progress_key(board):
+    """Returns a key that changes whenever a capture, a man move, a promotion or a power use happens"""
+    key = 0
+    square = 0
+    for row in board.board:
+        for piece in row:
+            # Kings can never hold a power, so only men (and their powers) are irreversible
+            if piece != 0 and not piece.king:
+                key ^= PIECE_KEYS[square][piece_state(piece)]
+            square += 1
+    return key, board.white_left, board.red_left
+
+
+class PositionHistory:
+    def __init__(self):
+        self.hashes = []
+        # Per position: its progress key and the index where its run of reversible moves began
+        self.progress = []
+        self.starts = []
+
+    def copy(self):
+        history = PositionHistory()
+        history.hashes = list(self.hashes)
+        history.progress = list(self.progress)
+        history.starts = list(self.starts)
+        return history
+
+    def push(self, board, turn):
+        """Adds the position reached with turn to move"""
+        progress = progress_key(board)
+        if self.progress and progress == self.progress[-1]:
+            start = self.starts[-1]
+        else:
+            start = len(self.hashes)
+        self.hashes.append(position_hash(board, turn))
+        self.progress.append(progress)
+        self.starts.append(start)
+
+    def pop(self):
+        """Removes the last position (used by the search when it backs up)"""
+        self.hashes.pop()
+        self.progress.pop()
+        self.starts.pop()
+
+    def truncate(self, length):
+        """Drops every position after the first length and returns them, for extend()"""
+        dropped = list(zip(self.hashes[length:], self.progress[length:], self.starts[length:]))
+        del self.hashes[length:], self.progress[length:], self.starts[length:]
+        return dropped
+
+    def extend(self, entries):
+        """Adds back positions returned by truncate()"""
+        for key, progress, start in entries:
+            self.hashes.append(key)
+            self.progress.append(progress)
+            self.starts.append(start)
+
+    def repetitions(self):
+        """How many times the current position has occurred, including now"""
+        if not self.hashes:
+            return 0
+        return self.hashes[self.starts[-1]:].count(self.hashes[-1])
+
+    def plies_without_progress(self):
+        return len(self.hashes) - 1 - self.starts[-1] if self.hashes else 0
+
+    def is_draw(self, repetition_limit=REPETITION_LIMIT):
+        """Whether the current position is drawn by repetition or by the no-progress rule"""
+        return (self.plies_without_progress() >= NO_PROGRESS_LIMIT
+                or self.repetitions() >= repetition_limit)
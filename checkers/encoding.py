@@ -0,0 +1,97 @@
+"""
+Fixed-size binary encoding of a position
+
+    byte 0      board size (8, 10 or 12)
+    byte 1      1 when White is to move
+    bytes 2-4   pending earth decision: captor, captured piece and destination
+                as PDN square numbers, all 0 when no decision is pending
+    bytes 5-    one byte per dark square in PDN order: 0 when empty, otherwise
+                1 + the piece's Zobrist piece_state (color, king, element, used)
+
+so an 8x8 position is 37 bytes, 10x10 is 55 and 12x12 is 77. Encoding and
+decoding are a single pass over the squares, far cheaper than pickling or
+deep-copying a Board, which makes encoded positions the way to store
+positions or hand them to another process.
+"""
+from .board import Board
+from .constants import BOARD_SIZES, WHITE, BLACK, ELEMENTS
+from .piece import Piece
+from .record import square_number, square_coords
+from .zobrist import PIECE_STATES, piece_state
+
+HEADER_SIZE = 5
+
+
+def _piece_states():
+    """Returns (color, king, element_power, power_used) for every piece_state index"""
+    states = [None] * PIECE_STATES
+    for element in [None] + ELEMENTS:
+        for used in (False, True):
+            for king in (False, True):
+                for color in (BLACK, WHITE):
+                    piece = Piece(0, 0, color)
+                    piece.king, piece.element_power, piece.power_used = king, element, used
+                    states[piece_state(piece)] = (color, king, element, used)
+    return states
+
+
+# The inverse of zobrist.piece_state
+_STATES = _piece_states()
+
+
+def encoded_size(size):
+    """Number of bytes in the encoding of a position on a size x size board"""
+    return HEADER_SIZE + size * size // 2
+
+
+def encode(board, turn):
+    """Returns the position (board, side to move and any pending earth decision) as bytes"""
+    data = bytearray(HEADER_SIZE)
+    data[0] = board.rows
+    data[1] = turn == WHITE
+    pending = board.pending_earth_power
+    if pending:
+        captor, captured = pending['captor'], pending['captured']
+        data[2] = square_number(captor.row, captor.col, board.cols)
+        data[3] = square_number(captured.row, captured.col, board.cols)
+        data[4] = square_number(*pending['destination'], board.cols)
+
+    for row_index, row in enumerate(board.board):
+        # Dark squares are the odd columns of even rows and the even columns of odd rows
+        for piece in row[(row_index + 1) % 2::2]:
+            data.append(0 if piece == 0 else piece_state(piece) + 1)
+    return bytes(data)
+
+
+def decode(data):
+    """Builds a (board, turn) pair from bytes written by encode"""
+    size = data[0] if data else 0
+    if size not in BOARD_SIZES or len(data) != encoded_size(size):
+        raise ValueError(f"Invalid position encoding of {len(data)} bytes")
+
+    # Skip Board.__init__, which would deal out a random starting position first
+    board = Board.__new__(Board)
+    board.rows = board.cols = size
+    board.board = [[0] * size for _ in range(size)]
+    board.white_left = board.red_left = 0
+    board.white_kings = board.black_kings = 0
+    board.pending_earth_power = None
+
+    index = HEADER_SIZE
+    for row in range(size):
+        for col in range((row + 1) % 2, size, 2):
+            code = data[index]
+            index += 1
+            if code:
+                color, king, element, used = _STATES[code - 1]
+                piece = Piece(row, col, color)
+                piece.king, piece.element_power, piece.power_used = king, element, used
+                board.place(piece)
+
+    if data[2]:
+        board.pending_earth_power = {
+            'captor': board.get_piece(*square_coords(data[2], size)),
+            'captured': board.get_piece(*square_coords(data[3], size)),
+            'destination': square_coords(data[4], size)
+        }
+    return board, WHITE if data[1] else BLACK
@@ -0,0 +1,34 @@
+import pygame
+from functools import lru_cache
+
+FONT_NAME = 'Arial'
+TEXT_CACHE_SIZE = 256
+
+# Fonts shared by every screen, keyed by (name, size)
+_fonts = {}
+
+
+def get_font(size, name=FONT_NAME):
+    """Returns the shared font for a name and size, loading it on first use"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        # SysFont does a system font lookup, so only pay for it once
+        font = pygame.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font, text, color):
+    """
+    Renders antialiased text, reusing the surface for repeated (font, text, color)
+    The returned surface is shared, so callers must only blit it
+    """
+    return font.render(text, True, color)
+
+
+def clear_cache():
+    """Drops all fonts and rendered text (needed after pygame.quit)"""
+    render_text.cache_clear()
+    _fonts.clear()
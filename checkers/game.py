@@ -1,11 +1,31 @@
 import pygame
-from .constants import WHITE, BLUE, SQUARE_SIZE, BLACK, RED, WIDTH, BOARD_HEIGHT
+from .constants import WHITE, BLUE, BLACK, RED, WIDTH, BOARD_HEIGHT, DRAW, ROWS
+from .draws import PositionHistory
+from .encoding import encode, decode, encoded_size
+from .fonts import get_font, render_text
+from .record import (GameRecord, RESULTS, UNFINISHED, snapshot, describe_move, square_number, square_coords,
+                     iter_records, apply_move)
+from .timeline import MoveHistory
+
+# Marks a cached winner that has not been computed for the current position
+_UNKNOWN = object()
+
+# Saved games: magic, format version, the square of a piece in the middle of a multi-capture
+# (0 if none) and the encoded position, followed by the game record as text
+SAVE_MAGIC = b'ECKS'
+SAVE_VERSION = 1
+
+
+def _has_capture(moves):
+    """Returns True if any of the moves captures a piece (power markers don't count)"""
+    return any(len(skipped) > 0 and not isinstance(skipped[-1], str) for skipped in moves.values())
 
 
 class Game:
-    def __init__(self, win):
-        """Initialize the game with the given window"""
+    def __init__(self, win, size=ROWS):
+        """Initialize the game with the given window and board size"""
         self.win = win
+        self.size = size
         self._init()
 
     def update(self):
@@ -18,23 +38,118 @@ class Game:
         """Initialize game state variables"""
         from .board import Board  # Import here to avoid circular imports
         self.selected = None
-        self.board = Board()
+        self.board = Board(self.size)
         self.turn = BLACK
         self.valid_moves = {}
         self.forced_capture = False  # Track if there's a forced capture
         self.last_move = None  # Track the last move for highlight
         self.power_dialog_active = False  # Track if we're showing a power dialog
         self.earth_power_active = False  # Track if earth power is being used
+        self.capture_continues = False  # Track if the selected piece is in the middle of a multi-capture
         # Track if a piece with fire ability was previously selected
         self.fire_piece_selected = False
+        self._invalidate_moves()
+
+        # Record of every move made, built from board snapshots at each change of turn
+        self.record = GameRecord.start(self.board, self.turn)
+        self._turn_start = snapshot(self.board)
+        self._earth_declined = None
+
+        # Hashes of every position at a change of turn, for the draw rules
+        self.history = PositionHistory()
+        self.history.push(self.board, self.turn)
+        # The same positions (and any undone ones) for undo, redo and seeking
+        self.timeline = MoveHistory(encode(self.board, self.turn))
+        # Draw history entries of the undone plies, handed back on redo
+        self._undone_history = []
+
+    def _invalidate_moves(self):
+        """Drops the cached legal moves and winner after the board or turn changed"""
+        self._legal_moves = None
+        self._capture_available = False
+        self._winner = _UNKNOWN
+
+    def legal_moves(self):
+        """Returns {(row, col): moves} for every piece of the side to move, generated once per position"""
+        if self._legal_moves is None:
+            self._legal_moves = {(piece.row, piece.col): self.board.get_valid_moves(piece)
+                                 for piece in self.board.get_all_pieces(self.turn)}
+            self._capture_available = any(_has_capture(moves) for moves in self._legal_moves.values())
+        return self._legal_moves
 
     def reset(self):
         """Reset the game to initial state"""
         self._init()
 
+    def save(self, path):
+        """Saves the game in progress, including a pending earth power choice or an unfinished multi-capture"""
+        capturing = square_number(self.selected.row, self.selected.col, self.board.cols) \
+            if self.capture_continues else 0
+        with open(path, 'wb') as file:
+            file.write(SAVE_MAGIC + bytes([SAVE_VERSION, capturing]))
+            file.write(encode(self.board, self.turn))
+            file.write(self.record.to_text().encode('utf-8'))
+
+    def load(self, path):
+        """Replaces the game with one written by save(); raises ValueError and keeps the game when it can't be read"""
+        with open(path, 'rb') as file:
+            data = file.read()
+        header = len(SAVE_MAGIC) + 2
+        if len(data) <= header or data[:len(SAVE_MAGIC)] != SAVE_MAGIC or data[len(SAVE_MAGIC)] != SAVE_VERSION:
+            raise ValueError(f"{path} is not a saved game")
+        try:
+            capturing = data[header - 1]
+            position_end = header + encoded_size(data[header])
+            board, turn = decode(data[header:position_end])
+            record = next(iter_records(data[position_end:].decode('utf-8').splitlines()))
+
+            # Replaying the record rebuilds the draw history and the position the current turn started from
+            start, start_turn = record.initial_position()
+            history = PositionHistory()
+            history.push(start, start_turn)
+            timeline = MoveHistory(encode(start, start_turn))
+            for move in record.moves:
+                apply_move(start, move)
+                start_turn = WHITE if start_turn == BLACK else BLACK
+                history.push(start, start_turn)
+                timeline.push(encode(start, start_turn), move)
+
+            captor = board.get_piece(*square_coords(capturing, board.cols)) if capturing else None
+            if captor == 0:
+                raise ValueError(f"No piece on square {capturing} to continue capturing")
+        except (ValueError, IndexError, KeyError, StopIteration) as error:
+            # Truncated, corrupt or foreign data fails in many ways; none of them may leave a half-loaded game
+            raise ValueError(f"{path} is not a saved game") from error
+
+        self.size = board.rows
+        self._init()
+        self.board, self.turn, self.record, self.history, self.timeline = board, turn, record, history, timeline
+        self._undone_history = []
+        self._turn_start = snapshot(start)
+        if board.pending_earth_power:
+            self.selected = board.pending_earth_power['captor']
+            self.earth_power_active = True
+        elif captor:
+            self.selected = captor
+            self.valid_moves = {move: skipped for move, skipped in board.get_valid_moves(self.selected).items()
+                                if skipped and not isinstance(skipped[-1], str)}
+            self.capture_continues = True
+
     def winner(self):
-        """Check if there's a winner"""
-        return self.board.winner()
+        """Check if there's a winner; returns DRAW when the repetition or no-progress rule ends the game"""
+        if self._winner is _UNKNOWN:
+            self._winner = self.board.winner()
+            if self._winner is None and self.history.is_draw():
+                self._winner = DRAW
+            if self._winner is not None:
+                # The game can end mid-turn, e.g. when a capture that could continue takes the last piece
+                if snapshot(self.board) != self._turn_start:
+                    self._record_turn()
+                    self.timeline.push(encode(self.board, WHITE if self.turn == BLACK else BLACK),
+                                       self.record.moves[-1])
+                    self._undone_history = []
+                self.record.result = RESULTS[self._winner]
+        return self._winner
 
     def select(self, row, col):
         """Select a piece or a destination for the selected piece"""
@@ -71,38 +186,56 @@ class Game:
                 
         # If no piece is selected, try to select one
         if clicked_piece != 0 and clicked_piece.color == self.turn:
-            # Check if there are any capture moves available for any piece
-            all_pieces = self.board.get_all_pieces(self.turn)
-            capture_available = False
-
-            for p in all_pieces:
-                moves = self.board.get_valid_moves(p)
-                if any(len(skipped) > 0 and not isinstance(skipped[-1], str) for skipped in moves.values()):
-                    capture_available = True
-                    break
+            moves = self.legal_moves()[(row, col)]
 
             # If capture is available, only allow selecting pieces that can capture
-            if capture_available:
-                moves = self.board.get_valid_moves(clicked_piece)
-                if any(len(skipped) > 0 and not isinstance(skipped[-1], str) for skipped in moves.values()):
-                    self.selected = clicked_piece
-                    self.valid_moves = moves
-                    # Reset fire piece selection flag when selecting a new piece
-                    self.fire_piece_selected = False
-                    return True
-                else:
-                    # Cannot select this piece if it can't capture
-                    return False
-            else:
-                # No captures available, can select any piece
-                self.selected = clicked_piece
-                self.valid_moves = self.board.get_valid_moves(clicked_piece)
-                # Reset fire piece selection flag when selecting a new piece
-                self.fire_piece_selected = False
-                return True
+            if self._capture_available and not _has_capture(moves):
+                # Cannot select this piece if it can't capture
+                return False
+
+            self.selected = clicked_piece
+            self.valid_moves = moves
+            # Reset fire piece selection flag when selecting a new piece
+            self.fire_piece_selected = False
+            return True
 
         return False
 
+    def play(self, start, end):
+        """
+        Plays a move for the side to move through the same rules as mouse clicks
+        start == end uses the piece's fire ability. Returns False if the move is not legal.
+        """
+        if self.earth_power_active:
+            return False
+        if self.selected is None or (self.selected.row, self.selected.col) != start:
+            if self.capture_continues:
+                # A multi-capture has to be finished with the same piece
+                return False
+            self.selected = None
+            self.select(*start)
+            if self.selected is None or (self.selected.row, self.selected.col) != start:
+                return False
+        if end not in self.valid_moves:
+            return False
+
+        if end == start:
+            # Same as clicking the selected fire piece twice more
+            return self._use_fire_ability(*start)
+        return self._move(*end)
+
+    def selectable_moves(self):
+        """Returns [(start, end)] for every move the side to move may make next"""
+        if self.earth_power_active:
+            return []
+        if self.capture_continues:
+            # In the middle of a multi-capture only the capturing piece's jumps remain
+            start = (self.selected.row, self.selected.col)
+            return [(start, end) for end in self.valid_moves]
+        moves = self.legal_moves()
+        return [(start, end) for start, piece_moves in moves.items()
+                if not self._capture_available or _has_capture(piece_moves) for end in piece_moves]
+
     def _use_fire_ability(self, row, col):
         """Activate fire ability to capture adjacent enemies without moving"""
         if not self.selected or self.selected.element_power != 'fire' or self.selected.power_used:
@@ -175,6 +308,7 @@ class Game:
             # If this move captured any pieces, remove them
             if skipped and not is_special_move:
                 self.board.remove(skipped)
+                self._invalidate_moves()
 
                 # Check if additional captures are available with this piece
                 self.selected.move(row, col)  # Update piece position
@@ -189,6 +323,7 @@ class Game:
                 if valid_additional:
                     # Additional captures available - don't change turn yet
                     self.valid_moves = valid_additional
+                    self.capture_continues = True
                     self.last_move = ((start_pos), (row, col))
                     # Reset fire piece selection flag
                     self.fire_piece_selected = False
@@ -207,6 +342,9 @@ class Game:
     def handle_earth_power_choice(self, use_power):
         """Handle the user's choice about using earth power"""
         if self.earth_power_active:
+            if not use_power:
+                captured = self.board.pending_earth_power['captured']
+                self._earth_declined = square_number(captured.row, captured.col, self.board.cols)
             # Execute the earth power logic
             self.board.execute_earth_power(use_power)
             self.earth_power_active = False
@@ -217,6 +355,7 @@ class Game:
 
     def draw_valid_moves(self, moves):
         """Draw valid move indicators"""
+        square = self.board.square_size
         for move in moves:
             row, col = move
             # Special indicator for fire ability (when clicking on the same piece)
@@ -225,20 +364,20 @@ class Game:
                     # Draw a red circle to indicate fire ability is available
                     pygame.draw.circle(
                         self.win, RED,
-                        (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2),
+                        (col * square + square // 2, row * square + square // 2),
                         15
                     )
                     # If this piece is marked for fire ability (clicked once), add a visual indicator
                     if self.fire_piece_selected:
                         pygame.draw.circle(
                             self.win, RED,
-                            (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2),
+                            (col * square + square // 2, row * square + square // 2),
                             20, 3  # Larger outline circle
                         )
             else:
                 pygame.draw.circle(
                     self.win, BLUE,
-                    (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2),
+                    (col * square + square // 2, row * square + square // 2),
                     15
                 )
 
@@ -250,18 +389,77 @@ class Game:
             e_row, e_col = end
 
             # Create transparent surface for highlighting
-            highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+            highlight_surface = pygame.Surface((square, square), pygame.SRCALPHA)
             highlight_surface.fill((255, 0, 0, 80))  # Semi-transparent red
 
             # Draw highlight for start and end positions
-            self.win.blit(highlight_surface, (s_col * SQUARE_SIZE, s_row * SQUARE_SIZE))
-            self.win.blit(highlight_surface, (e_col * SQUARE_SIZE, e_row * SQUARE_SIZE))
+            self.win.blit(highlight_surface, (s_col * square, s_row * square))
+            self.win.blit(highlight_surface, (e_col * square, e_row * square))
 
     def change_turn(self):
+        self._record_turn()
+        self._invalidate_moves()
         self.valid_moves = {}
+        self.capture_continues = False
         self.selected = None
         self.fire_piece_selected = False
         self.turn = WHITE if self.turn == BLACK else BLACK
+        self.history.push(self.board, self.turn)
+        self.timeline.push(encode(self.board, self.turn), self.record.moves[-1])
+        self._undone_history = []
+
+    def undo(self):
+        """Takes back the turn in progress, or the last move when none is; returns False at the start"""
+        if self.earth_power_active or snapshot(self.board) != self._turn_start:
+            self.seek(self.timeline.ply)
+            return True
+        if not self.timeline.can_undo():
+            return False
+        self.seek(self.timeline.ply - 1)
+        return True
+
+    def redo(self):
+        """Plays the last undone move again; returns False when there is none"""
+        if not self.timeline.can_redo():
+            return False
+        self.seek(self.timeline.ply + 1)
+        return True
+
+    def seek(self, ply):
+        """Goes to the position at the start of a ply of the game, keeping the later plies for redo"""
+        board, turn = decode(self.timeline.seek(ply))
+        # The draw history holds one position per ply, up to the current one
+        self._undone_history[:0] = self.history.truncate(ply + 1)
+        redone = ply + 1 - len(self.history.hashes)
+        self.history.extend(self._undone_history[:redone])
+        del self._undone_history[:redone]
+        # A game that ended mid-turn has a last ply the draw history never saw
+        for step in range(len(self.history.hashes), ply + 1):
+            self.history.push(*decode(self.timeline.position(step)))
+
+        self.board, self.turn = board, turn
+        self.record.moves = self.timeline.moves[:ply]
+        self.record.result = UNFINISHED
+        self._turn_start = snapshot(board)
+        self._earth_declined = None
+        self._invalidate_moves()
+        self.selected = None
+        self.valid_moves = {}
+        self.capture_continues = False
+        self.earth_power_active = False
+        self.fire_piece_selected = False
+        move = self.record.moves[-1] if self.record.moves else None
+        self.last_move = None
+        if move is not None and move.start is not None:
+            self.last_move = (square_coords(move.start, board.cols), square_coords(move.end, board.cols))
+
+    def _record_turn(self):
+        """Adds the move the side to move just finished to the game record"""
+        after = snapshot(self.board)
+        self.record.moves.append(describe_move(self._turn_start, after, self.turn, self._earth_declined,
+                                               self.board.rows))
+        self._turn_start = after
+        self._earth_declined = None
 
     def get_board(self):
         return self.board
@@ -290,21 +488,21 @@ class Game:
         pygame.draw.rect(win, (0, 0, 0), (dialog_x, dialog_y, dialog_width, dialog_height), 2)
         
         # Setup font
-        font = pygame.font.SysFont('Arial', 24)
-        small_font = pygame.font.SysFont('Arial', 20)
+        font = get_font(24)
+        small_font = get_font(20)
         
         # Draw message
         message = "Your piece is being captured!"
-        text = font.render(message, True, (0, 0, 0))
+        text = render_text(font, message, (0, 0, 0))
         win.blit(text, (dialog_x + (dialog_width - text.get_width()) // 2, dialog_y + 30))
         
         message2 = "Use Earth power to avoid capture?"
-        text2 = small_font.render(message2, True, (0, 0, 0))
+        text2 = render_text(small_font, message2, (0, 0, 0))
         win.blit(text2, (dialog_x + (dialog_width - text2.get_width()) // 2, dialog_y + 70))
         
         # Draw description
         description = "Earth power allows a piece to avoid being captured"
-        desc_text = small_font.render(description, True, (0, 0, 0))
+        desc_text = render_text(small_font, description, (0, 0, 0))
         win.blit(desc_text, (dialog_x + (dialog_width - desc_text.get_width()) // 2, dialog_y + 100))
         
         # Draw yes button
@@ -316,7 +514,7 @@ class Game:
         pygame.draw.rect(win, (100, 200, 100), yes_button)  # Green button
         pygame.draw.rect(win, (0, 0, 0), yes_button, 2)     # Black border
         
-        yes_text = font.render("Yes", True, (0, 0, 0))
+        yes_text = render_text(font, "Yes", (0, 0, 0))
         win.blit(yes_text, (yes_button_x + (yes_button_width - yes_text.get_width()) // 2, 
                           yes_button_y + (yes_button_height - yes_text.get_height()) // 2))
         
@@ -329,7 +527,7 @@ class Game:
         pygame.draw.rect(win, (200, 100, 100), no_button)  # Red button
         pygame.draw.rect(win, (0, 0, 0), no_button, 2)     # Black border
         
-        no_text = font.render("No", True, (0, 0, 0))
+        no_text = render_text(font, "No", (0, 0, 0))
         win.blit(no_text, (no_button_x + (no_button_width - no_text.get_width()) // 2, 
                          no_button_y + (no_button_height - no_text.get_height()) // 2))
         
@@ -1,66 +1,66 @@
 import pygame
-from .constants import WHITE, SQUARE_SIZE, GREY, CROWN, FIRE, WATER, AIR, EARTH
+from .constants import WHITE, BLACK, SQUARE_SIZE, GREY, CROWN, FIRE, WATER, AIR, EARTH, ELEMENTS
+
+ELEMENT_ICONS = {'fire': FIRE, 'water': WATER, 'air': AIR, 'earth': EARTH}
+
+# Pre-rendered piece images keyed by (square size, color, king, element_power, power_used)
+_sprites = {}
+# Pieces released by discarded search boards, reused by Piece.copy
+_pool = []
 
 class Piece:
     PADDING = 15
     OUTLINE = 2
+    # No per-instance __dict__: the search copies thousands of pieces per move
+    __slots__ = ('row', 'col', 'color', 'king', 'element_power', 'power_used')
 
     def __init__(self, row, col, color):
         self.row = row
         self.col = col
         self.color = color
         self.king = False
-        self.x = 0
-        self.y = 0
         
         # Elemental power tracking
         self.element_power = None
         self.power_used = False
-        
-        self.calc_pos()
 
     def move(self, row, col):
         """Updates the piece's position"""
         self.row = row
         self.col = col
-        self.calc_pos()
 
-    def calc_pos(self):
-        """Calculates the pixel position based on row and column"""
-        self.x = SQUARE_SIZE * self.col + SQUARE_SIZE // 2
-        self.y = SQUARE_SIZE * self.row + SQUARE_SIZE // 2
+    def copy(self):
+        """Returns a copy of the piece, reusing a released one when available"""
+        try:
+            piece = _pool.pop()
+        except IndexError:
+            piece = Piece.__new__(Piece)
+        piece.row = self.row
+        piece.col = self.col
+        piece.color = self.color
+        piece.king = self.king
+        piece.element_power = self.element_power
+        piece.power_used = self.power_used
+        return piece
+
+    def release(self):
+        """Hands the piece back for reuse by copy(); it must not be used afterwards"""
+        _pool.append(self)
 
     def make_king(self):
         """Promotes piece to king"""
         self.king = True
         self.power_used = True
 
-    def draw(self, win):
+    def draw(self, win, square_size=SQUARE_SIZE):
         """Draws the piece on the window"""
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        pygame.draw.circle(win, GREY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        
-        # Draw king crown if applicable
-        if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width() // 2, self.y - CROWN.get_height() // 2))
-        
-        # Draw elemental icon if applicable
-        if self.element_power and not self.power_used:
-            icon = None
-            if self.element_power == 'fire':
-                icon = FIRE
-            elif self.element_power == 'water':
-                icon = WATER
-            elif self.element_power == 'air':
-                icon = AIR
-            elif self.element_power == 'earth':
-                icon = EARTH
-            
-            if icon:
-                # Position the icon in the bottom right of the piece
-                icon_pos = (self.x + radius//2, self.y + radius//2)
-                win.blit(icon, (icon_pos[0] - icon.get_width()//2, icon_pos[1] - icon.get_height()//2))
+        key = (square_size, self.color, self.king, self.element_power, self.power_used)
+        sprite = _sprites.get(key)
+        if sprite is None:
+            build_sprite_atlas(square_size)
+            sprite = _sprites[key]
+        # Pixel positions are only needed here, so they are not stored on the piece
+        win.blit(sprite, (square_size * self.col, square_size * self.row))
 
     def set_element(self, element):
         """Set the elemental power for this piece"""
@@ -76,4 +76,41 @@ class Piece:
         
     def __repr__(self):
         """String representation of the piece"""
-        return str(self.color)
\ No newline at end of file
+        return str(self.color)
+
+
+def _render_sprite(color, king, element_power, power_used):
+    """Renders one piece variant onto a transparent square-sized surface"""
+    sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    center = SQUARE_SIZE // 2
+    radius = SQUARE_SIZE // 2 - Piece.PADDING
+    pygame.draw.circle(sprite, GREY, (center, center), radius + Piece.OUTLINE)
+    pygame.draw.circle(sprite, color, (center, center), radius)
+
+    # Draw king crown if applicable
+    if king:
+        sprite.blit(CROWN, (center - CROWN.get_width() // 2, center - CROWN.get_height() // 2))
+
+    # Draw elemental icon in the bottom right of the piece if the power is still available
+    icon = ELEMENT_ICONS.get(element_power)
+    if icon and not power_used:
+        icon_pos = (center + radius // 2, center + radius // 2)
+        sprite.blit(icon, (icon_pos[0] - icon.get_width() // 2, icon_pos[1] - icon.get_height() // 2))
+
+    return sprite
+
+
+def build_sprite_atlas(square_size=SQUARE_SIZE):
+    """Pre-renders every color x king x element x power-used combination of a piece for one square size"""
+    # Match the display's pixel format when a window exists so blits stay cheap
+    convert = pygame.display.get_surface() is not None
+    for color in (WHITE, BLACK):
+        for king in (False, True):
+            for element_power in [None] + ELEMENTS:
+                for power_used in (False, True):
+                    sprite = _render_sprite(color, king, element_power, power_used)
+                    # Larger boards reuse the 8x8 artwork, scaled down as a whole
+                    if square_size != SQUARE_SIZE:
+                        sprite = pygame.transform.smoothscale(sprite, (square_size, square_size))
+                    key = (square_size, color, king, element_power, power_used)
+                    _sprites[key] = sprite.convert_alpha() if convert else sprite
@@ -0,0 +1,183 @@
+"""
+On-demand profiling of AI moves and frames
+
+A Profiler is armed for the next N AI moves or drawn frames, either from the
+environment at startup or with the P key in the game:
+
+    CHECKERS_PROFILE=ai:5            profile the next 5 AI moves by sampling
+    CHECKERS_PROFILE=frames:100:cprofile
+                                     profile the next 100 frames with cProfile
+    CHECKERS_PROFILE_DIR=profiles    where the output goes (default: ./profiles)
+
+Sampling records the profiled thread's stack every SAMPLE_INTERVAL seconds and
+writes <target>-sample-<time>.collapsed, one "outer;...;inner count" line per stack, as
+read by flamegraph.pl or speedscope. cProfile writes <target>-cprofile-<time>.prof for
+pstats, snakeviz or flameprof. Both write a .txt with the top functions, which
+is also printed.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_ENV = 'CHECKERS_PROFILE'
+PROFILE_DIR = os.environ.get('CHECKERS_PROFILE_DIR', 'profiles')
+TARGETS = ('ai', 'frames')
+MODES = ('sample', 'cprofile')
+# AI moves or frames profiled when no count is given
+PROFILE_COUNT = 5
+SAMPLE_INTERVAL = 0.001
+# Functions listed in the summary
+SUMMARY_LINES = 15
+
+
+class Profiler:
+    def __init__(self, output_dir=PROFILE_DIR):
+        self.output_dir = output_dir
+        self.target = None
+        self.mode = None
+        self.remaining = 0
+        self.profile = None
+        self.sampler = None
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Returns a Profiler, armed when CHECKERS_PROFILE is set to <ai|frames>[:count][:sample|cprofile]"""
+        profiler = cls()
+        spec = environ.get(PROFILE_ENV)
+        if spec:
+            target, *options = spec.split(':')
+            count = next((int(option) for option in options if option.isdigit()), PROFILE_COUNT)
+            mode = next((option for option in options if option in MODES), MODES[0])
+            profiler.arm(target, count, mode)
+        return profiler
+
+    @property
+    def active(self):
+        return self.target is not None
+
+    def arm(self, target, count=PROFILE_COUNT, mode=MODES[0]):
+        """Profiles the next count AI moves or frames"""
+        if target not in TARGETS or mode not in MODES or count < 1:
+            raise ValueError(f"Cannot profile {count} {target} with {mode}")
+        self.target, self.mode, self.remaining = target, mode, count
+        if mode == 'cprofile':
+            self.profile = cProfile.Profile()
+        else:
+            self.sampler = Sampler()
+        print(f"Profiling the next {count} {'AI moves' if target == 'ai' else 'frames'} ({mode})")
+
+    @contextmanager
+    def capture(self, target):
+        """Profiles the body when the profiler is armed for this target"""
+        if self.target != target:
+            yield
+            return
+
+        if self.profile is not None:
+            self.profile.enable()
+        else:
+            self.sampler.start()
+        try:
+            yield
+        finally:
+            if self.profile is not None:
+                self.profile.disable()
+            else:
+                self.sampler.stop()
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.write()
+
+    def write(self):
+        """Writes the collected data and summary, then disarms the profiler"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.target}-{self.mode}-{time.strftime('%Y%m%d-%H%M%S')}")
+        if self.profile is not None:
+            path = base + '.prof'
+            self.profile.dump_stats(path)
+            summary = _cprofile_summary(self.profile)
+        else:
+            path = base + '.collapsed'
+            with open(path, 'w', encoding='utf-8') as file:
+                for stack, count in sorted(self.sampler.stacks.items()):
+                    file.write(f"{stack} {count}\n")
+            summary = self.sampler.summary()
+
+        with open(base + '.txt', 'w', encoding='utf-8') as file:
+            file.write(summary)
+        print(summary)
+        print(f"Wrote {path} and {base}.txt")
+        self.target = self.mode = self.profile = self.sampler = None
+        self.remaining = 0
+
+
+class Sampler:
+    """Counts the stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        # "outer;...;inner" -> samples
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+        self.running = False
+        self.target_id = None
+        self.switch_interval = None
+
+    def start(self):
+        """Starts sampling the calling thread"""
+        self.target_id = threading.get_ident()
+        self.running = True
+        # The sampler needs the GIL to take a sample, so ask for it to be handed over more often
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        sys.setswitchinterval(self.switch_interval)
+
+    def _run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.target_id)
+            if frame is not None:
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def summary(self):
+        """Returns the functions with the most samples, on top of the stack (self) and anywhere in it (total)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            names = stack.split(';')
+            own[names[-1]] += count
+            # Recursive functions count once per sample
+            for name in set(names):
+                total[name] += count
+
+        lines = [f"{self.samples} samples every {self.interval * 1000:.1f} ms",
+                 f"{'self %':>7} {'total %':>8}  function"]
+        for name, count in own.most_common(SUMMARY_LINES):
+            lines.append(f"{count / self.samples * 100:7.1f} {total[name] / self.samples * 100:8.1f}  {name}")
+        return '\n'.join(lines) + '\n' if self.samples else 'No samples taken\n'
+
+
+def _cprofile_summary(profile):
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream).strip_dirs()
+    stats.sort_stats('tottime').print_stats(SUMMARY_LINES)
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    return stream.getvalue()
@@ -0,0 +1,354 @@
+"""
+Game records in a PDN-like text format, extended for elemental powers
+
+A record is a block of tag pairs followed by movetext:
+
+    [Event "Elemental Checkers"]
+    [Black "Human"]
+    [White "AI"]
+    [Result "0-1"]
+    [FEN "B:W1f,2w,3a,...:B21e,22F,K23,..."]
+
+    1. 22-18 11-15 2. 18x11(15) --/e15 3. 21x21(17)/F 10-19/A ... 0-1
+
+Squares are the dark squares numbered 1..32 row by row from the top (row 0)
+(1..50 on 10x10 and 1..72 on 12x12 boards, whose FEN ends with :S10 or :S12).
+In the FEN a piece is [K]<square>[element], with the element letter
+(f, w, a, e) lower case while the power is unused and upper case once used.
+A move is <from>-<to>, or <from>x<to>(<captured squares>) for captures, with
+annotations: /F /W /A for the mover's power, /K when a capture crowned the
+piece on the way to a square short of the last row, /E<sq> when the piece on <sq>
+used earth power to avoid capture and /e<sq> when it declined to (the turn
+then passes without a move, written as --).
+"""
+import gzip
+import re
+from collections import namedtuple
+from datetime import date
+from .constants import ROWS, COLS, BOARD_SIZES, WHITE, BLACK, DRAW
+from .piece import Piece
+
+ELEMENT_LETTERS = {'fire': 'f', 'water': 'w', 'air': 'a', 'earth': 'e'}
+LETTER_ELEMENTS = {letter: element for element, letter in ELEMENT_LETTERS.items()}
+
+RESULTS = {BLACK: '1-0', WHITE: '0-1', DRAW: '1/2-1/2'}
+UNFINISHED = '*'
+RESULT_TOKENS = tuple(RESULTS.values()) + (UNFINISHED,)
+
+# Move annotations for powers the moving piece used
+POWER_CODES = {'fire': 'F', 'water': 'W', 'air': 'A'}
+
+RecordedMove = namedtuple('RecordedMove', ['start', 'end', 'captured', 'power', 'earth', 'earth_declined', 'crowned'])
+
+_TAG_RE = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_MOVE_RE = re.compile(r'^(\d+)([-x])(\d+)(?:\(([\d,]*)\))?((?:/[FWAK]|/[Ee]\d+)*)$')
+_PIECE_RE = re.compile(r'^(K?)(\d+)([fwaeFWAE]?)$')
+
+
+def square_number(row, col, cols=COLS):
+    """Returns the PDN number (1-based) of a dark square"""
+    return row * (cols // 2) + col // 2 + 1
+
+
+def square_coords(number, cols=COLS):
+    """Returns (row, col) of a PDN square number"""
+    row, index = divmod(number - 1, cols // 2)
+    return row, index * 2 + (1 if row % 2 == 0 else 0)
+
+
+def snapshot(board):
+    """Returns {square: (color, king, element_power, power_used)} for every piece on the board"""
+    return {square_number(piece.row, piece.col, board.cols): (piece.color, piece.king, piece.element_power,
+                                                              piece.power_used)
+            for row in board.board for piece in row if piece != 0}
+
+
+def to_fen(board, turn):
+    """Describes a position (side to move, pieces, kings, elements and used powers) as a FEN string"""
+    pieces = snapshot(board)
+    sides = []
+    for color, prefix in ((WHITE, 'W'), (BLACK, 'B')):
+        tokens = []
+        for square in sorted(pieces):
+            piece_color, king, element, used = pieces[square]
+            if piece_color != color:
+                continue
+            letter = ELEMENT_LETTERS.get(element, '')
+            tokens.append(f"{'K' if king else ''}{square}{letter.upper() if used else letter}")
+        sides.append(prefix + ','.join(tokens))
+    fen = f"{'B' if turn == BLACK else 'W'}:{sides[0]}:{sides[1]}"
+    # Only boards other than 8x8 name their size, so 8x8 records read as before
+    return fen if board.rows == ROWS else f"{fen}:S{board.rows}"
+
+
+def from_fen(fen):
+    """Builds a (board, turn) pair from a FEN string written by to_fen"""
+    from .board import Board  # Import here to avoid circular imports
+    fields = fen.strip().split(':')
+    size = ROWS
+    if len(fields) == 4 and fields[3][:1] == 'S' and fields[3][1:].isdigit():
+        size = int(fields.pop()[1:])
+    if len(fields) != 3 or fields[0] not in ('B', 'W') or size not in BOARD_SIZES:
+        raise ValueError(f"Invalid FEN: {fen!r}")
+
+    board = Board(size)
+    board.clear()
+    for field in fields[1:]:
+        color = WHITE if field[0] == 'W' else BLACK
+        for token in filter(None, field[1:].split(',')):
+            match = _PIECE_RE.match(token)
+            if not match:
+                raise ValueError(f"Invalid piece {token!r} in FEN")
+            king, square, letter = match.groups()
+            row, col = square_coords(int(square), size)
+            piece = Piece(row, col, color)
+            piece.king = bool(king)
+            if letter:
+                piece.set_element(LETTER_ELEMENTS[letter.lower()])
+                piece.power_used = letter.isupper()
+            elif piece.king:
+                # Promotion spends the power, so a king with no element letter has none left
+                piece.power_used = True
+            board.place(piece)
+
+    return board, BLACK if fields[0] == 'B' else WHITE
+
+
+def describe_move(before, after, color, earth_declined=None, size=ROWS):
+    """
+    Works out the move a side made from snapshots taken before and after its turn
+    earth_declined is the square of a piece that chose not to use earth power
+    """
+    left = [square for square in before if before[square][0] == color and after.get(square) != before[square]]
+    captured = tuple(sorted(square for square in before if before[square][0] != color and square not in after))
+    earth = next((square for square in before if before[square][0] != color and square in after
+                  and before[square][2] == 'earth' and not before[square][3] and after[square][3]), None)
+
+    # Fire captures without moving, so the same square both changes and stays ours
+    moved = [square for square in left if square not in after]
+    landed = [square for square in after if after[square][0] == color and square not in before]
+    if moved and landed:
+        start, end = moved[0], landed[0]
+    elif left:
+        start = end = left[0]
+    else:
+        # Declining earth power ends the turn without the capturing piece moving
+        start = end = None
+
+    power = ''
+    crowned = False
+    if start is not None:
+        _, was_king, element, was_used = before[start]
+        _, is_king, _, is_used = after[end]
+        if element in POWER_CODES and not was_used and is_used:
+            start_row, end_row = square_coords(start, size)[0], square_coords(end, size)[0]
+            forward = 1 if color == WHITE else -1
+            if element == 'fire':
+                used_power = start == end and bool(captured)
+            elif element == 'air':
+                used_power = not was_king and not captured and abs(end_row - start_row) == 2 \
+                             and (end_row - start_row) * forward > 0
+            else:
+                used_power = not was_king and (end_row - start_row) * forward < 0
+            # Promotion also marks the power as used, so only trust the flag without one
+            if used_power or not (is_king and not was_king):
+                power = POWER_CODES[element]
+
+        # A multi-capture can pass through the last row and end somewhere else
+        last_row = size - 1 if color == WHITE else 0
+        crowned = is_king and not was_king and square_coords(end, size)[0] != last_row
+
+    return RecordedMove(start, end, captured, power, earth, earth_declined, crowned)
+
+
+def format_move(move):
+    """Returns the movetext token for a recorded move"""
+    if move.start is None:
+        text = '--'
+    elif move.captured:
+        text = f"{move.start}x{move.end}({','.join(str(square) for square in move.captured)})"
+    else:
+        text = f"{move.start}-{move.end}"
+    if move.power:
+        text += '/' + move.power
+    if move.crowned:
+        text += '/K'
+    if move.earth is not None:
+        text += f"/E{move.earth}"
+    if move.earth_declined is not None:
+        text += f"/e{move.earth_declined}"
+    return text
+
+
+def parse_move(token):
+    """Parses a movetext token written by format_move"""
+    if token.startswith('--'):
+        annotations = token[2:]
+        start = end = None
+        captured = ()
+    else:
+        match = _MOVE_RE.match(token)
+        if not match:
+            raise ValueError(f"Invalid move {token!r}")
+        start, kind, end, captured, annotations = match.groups()
+        start, end = int(start), int(end)
+        captured = tuple(int(square) for square in captured.split(',') if square) if captured else ()
+
+    power = ''
+    earth = earth_declined = None
+    crowned = False
+    for annotation in filter(None, annotations.split('/')):
+        if annotation == 'K':
+            crowned = True
+        elif annotation[0] == 'E':
+            earth = int(annotation[1:])
+        elif annotation[0] == 'e':
+            earth_declined = int(annotation[1:])
+        else:
+            power = annotation
+    return RecordedMove(start, end, captured, power, earth, earth_declined, crowned)
+
+
+def apply_move(board, move):
+    """Plays a recorded move on the board"""
+    if move.start is not None:
+        piece = board.get_piece(*square_coords(move.start, board.cols))
+        if move.start != move.end:
+            board.move(piece, *square_coords(move.end, board.cols))
+        if move.captured:
+            board.remove([board.get_piece(*square_coords(square, board.cols)) for square in move.captured])
+        if move.power:
+            piece.use_power()
+        if move.crowned and not piece.king:
+            board.crown(piece)
+    if move.earth is not None:
+        board.get_piece(*square_coords(move.earth, board.cols)).use_power()
+
+
+class GameRecord:
+    def __init__(self, tags=None, moves=None):
+        self.tags = dict(tags or {})
+        self.moves = list(moves or [])
+
+    @classmethod
+    def start(cls, board, turn, **tags):
+        """Starts a record for a game beginning from the given position"""
+        record = cls({'Event': 'Elemental Checkers', 'Date': date.today().strftime('%Y.%m.%d'),
+                      'Black': '?', 'White': '?', 'Result': UNFINISHED})
+        record.tags.update(tags)
+        record.tags['FEN'] = to_fen(board, turn)
+        return record
+
+    @property
+    def result(self):
+        return self.tags.get('Result', UNFINISHED)
+
+    @result.setter
+    def result(self, value):
+        self.tags['Result'] = value
+
+    def initial_position(self):
+        """Returns (board, turn) at the start of the game"""
+        return from_fen(self.tags['FEN'])
+
+    def positions(self):
+        """Yields (board, turn, move) before every move; the board is updated in place between moves"""
+        board, turn = self.initial_position()
+        for move in self.moves:
+            yield board, turn, move
+            apply_move(board, move)
+            turn = WHITE if turn == BLACK else BLACK
+
+    def to_text(self, width=79):
+        """Returns the record as PDN-like text"""
+        lines = [f'[{name} "{value}"]' for name, value in self.tags.items()]
+        lines.append('')
+
+        turn = BLACK if self.tags['FEN'].startswith('B') else WHITE
+        tokens = []
+        number = 1
+        for index, move in enumerate(self.moves):
+            if turn == BLACK:
+                tokens.append(f"{number}.")
+            elif index == 0:
+                tokens.append(f"{number}...")
+            tokens.append(format_move(move))
+            if turn == WHITE:
+                number += 1
+            turn = WHITE if turn == BLACK else BLACK
+        tokens.append(self.result)
+
+        line = ''
+        for token in tokens:
+            if line and len(line) + len(token) + 1 > width:
+                lines.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        lines.append(line)
+        return '\n'.join(lines) + '\n\n'
+
+
+class RecordWriter:
+    """Appends game records to a file, one record at a time"""
+
+    def __init__(self, path):
+        self.file = _open(path, 'a')
+
+    def write(self, record):
+        self.file.write(record.to_text())
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path):
+    """Lazily yields GameRecords from a file, reading it line by line (.gz files are decompressed on the fly)"""
+    with _open(path, 'r') as file:
+        yield from iter_records(file)
+
+
+def iter_records(lines):
+    """Yields GameRecords parsed from an iterable of text lines"""
+    tags = {}
+    moves = []
+    in_movetext = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        match = _TAG_RE.match(line)
+        if match:
+            # Tags after movetext start the next game, even if the result token was missing
+            if in_movetext:
+                yield GameRecord(tags, moves)
+                tags, moves, in_movetext = {}, [], False
+            tags[match.group(1)] = match.group(2)
+            continue
+
+        in_movetext = True
+        for token in line.split():
+            if token in RESULT_TOKENS:
+                tags.setdefault('Result', token)
+                yield GameRecord(tags, moves)
+                tags, moves, in_movetext = {}, [], False
+            elif not token.endswith('.'):
+                moves.append(parse_move(token))
+
+    if tags or moves:
+        yield GameRecord(tags, moves)
+
+
+def _open(path, mode):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
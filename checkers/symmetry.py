@@ -0,0 +1,95 @@
+"""
+Color-flip symmetry of positions
+
+Turning the board half a turn and swapping the colors of every piece (elements
+and used powers stay as they are) gives a position that plays exactly like the
+original with the sides exchanged: White's men advance towards the last row and
+Black's towards row 0, so the rotated pieces keep their promotion distance,
+and dark squares stay dark. A position's evaluation from White's point of view
+is the negation of its flip's.
+
+Tables only need to keep one of the two. canonical_hash() returns the smaller
+of the two Zobrist hashes and whether it belongs to the flipped position, so a
+caller stores results of the canonical orientation and converts them
+(negating an evaluation, swapping White's and Black's results) when the
+position it looked up was the flipped one.
+"""
+from .board import Board
+from .constants import BOARD_SIZES, WHITE, BLACK
+from .encoding import HEADER_SIZE
+from .piece import Piece
+from .zobrist import PIECE_KEYS, PIECE_STATES, SIZE_KEYS, WHITE_TO_MOVE, piece_state
+
+
+def _flipped_keys(size):
+    """Per square and piece state, the Zobrist key of the flipped piece on the rotated square"""
+    last = size * size - 1
+    # piece_state keeps the color in its lowest bit
+    return [[PIECE_KEYS[last - square][state ^ 1] for state in range(PIECE_STATES)] for square in range(size * size)]
+
+
+FLIPPED_KEYS = {size: _flipped_keys(size) for size in BOARD_SIZES}
+
+
+def canonical_hash(board, turn=None):
+    """
+    Returns (hash, flipped): the smaller of the Zobrist hashes of the position and of its flip,
+    and True when that is the flip's. The side to move is included when turn is given.
+    """
+    key = flipped_key = SIZE_KEYS[board.rows]
+    flipped_keys = FLIPPED_KEYS[board.rows]
+    square = 0
+    for row in board.board:
+        for piece in row:
+            if piece != 0:
+                state = piece_state(piece)
+                key ^= PIECE_KEYS[square][state]
+                flipped_key ^= flipped_keys[square][state]
+            square += 1
+    if turn == WHITE:
+        key ^= WHITE_TO_MOVE
+    elif turn == BLACK:
+        flipped_key ^= WHITE_TO_MOVE
+    return (flipped_key, True) if flipped_key < key else (key, False)
+
+
+def flip(board, turn=None):
+    """Returns (board, turn) with the board turned half a turn and every piece's color swapped"""
+    flipped = Board.__new__(Board)
+    flipped.rows, flipped.cols = board.rows, board.cols
+    flipped.board = [[0] * board.cols for _ in range(board.rows)]
+    flipped.white_left = flipped.red_left = flipped.white_kings = flipped.black_kings = 0
+    flipped.pending_earth_power = None
+    last = board.rows - 1
+    for row in board.board:
+        for piece in row:
+            if piece != 0:
+                copy = Piece(last - piece.row, last - piece.col, BLACK if piece.color == WHITE else WHITE)
+                copy.king, copy.element_power, copy.power_used = piece.king, piece.element_power, piece.power_used
+                flipped.place(copy)
+
+    pending = board.pending_earth_power
+    if pending:
+        captor, captured = pending['captor'], pending['captured']
+        flipped.pending_earth_power = {
+            'captor': flipped.board[last - captor.row][last - captor.col],
+            'captured': flipped.board[last - captured.row][last - captured.col],
+            'destination': (last - pending['destination'][0], last - pending['destination'][1])
+        }
+    if turn is not None:
+        turn = BLACK if turn == WHITE else WHITE
+    return flipped, turn
+
+
+def flip_encoded(data):
+    """Flips a position encoded by checkers.encoding without decoding it"""
+    squares = len(data) - HEADER_SIZE
+    flipped = bytearray(data[:HEADER_SIZE])
+    flipped[1] = not data[1]
+    if data[2]:
+        # PDN numbers run in reading order, so the half turn maps square n to squares + 1 - n
+        for index in (2, 3, 4):
+            flipped[index] = squares + 1 - data[index]
+    # ... and reverses the squares; a piece's code is its piece_state + 1 with the color in the lowest bit
+    flipped += bytes(((code - 1) ^ 1) + 1 if code else 0 for code in reversed(data[HEADER_SIZE:]))
+    return bytes(flipped)
@@ -0,0 +1,93 @@
+"""
+Move history for undo, redo and seeking
+
+Every position at a change of turn is kept as the difference from the one
+before it: the bytes of the fixed-size encoding (checkers.encoding) that the
+move changed, each stored as (index, old value, new value). A move touches a
+handful of bytes, so a ply costs about a dozen bytes where a Board costs
+kilobytes. Every KEYFRAME_INTERVAL plies the whole encoding is kept as well, so
+reaching any ply means copying the keyframe before it and applying at most
+KEYFRAME_INTERVAL - 1 differences; undo and redo apply a single one.
+"""
+from array import array
+
+# Plies between full positions
+KEYFRAME_INTERVAL = 32
+
+
+def diff(before, after):
+    """Returns the bytes that change an encoded position into another of the same size"""
+    changes = bytearray()
+    for index, (old, new) in enumerate(zip(before, after)):
+        if old != new:
+            changes += bytes((index, old, new))
+    return bytes(changes)
+
+
+class MoveHistory:
+    def __init__(self, position):
+        """Starts the history at an encoded position (ply 0)"""
+        self.ply = 0
+        self.current = bytearray(position)
+        self.keyframes = [bytes(position)]
+        # The differences of every ply back to back; ply p's are changes[offsets[p - 1]:offsets[p]]
+        self.changes = bytearray()
+        self.offsets = array('I', [0])
+        # The move leading to each ply, the one to ply p at index p - 1
+        self.moves = []
+
+    def __len__(self):
+        """Number of plies, including any that were undone and can be redone"""
+        return len(self.offsets) - 1
+
+    def push(self, position, move=None):
+        """Adds the position after a move, dropping the plies that could have been redone"""
+        if self.ply < len(self):
+            self._truncate(self.ply)
+        self.changes += diff(self.current, position)
+        self.offsets.append(len(self.changes))
+        self.moves.append(move)
+        self.ply += 1
+        self.current[:] = position
+        if self.ply % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append(bytes(position))
+
+    def _truncate(self, ply):
+        del self.changes[self.offsets[ply]:]
+        del self.offsets[ply + 1:]
+        del self.moves[ply:]
+        del self.keyframes[ply // KEYFRAME_INTERVAL + 1:]
+
+    def _apply(self, position, ply, forward=True):
+        """Plays ply's differences on position forwards (to ply) or backwards (to ply - 1)"""
+        changes = self.changes
+        new = 2 if forward else 1
+        for index in range(self.offsets[ply - 1], self.offsets[ply], 3):
+            position[changes[index]] = changes[index + new]
+
+    def position(self, ply):
+        """Returns the encoded position at a ply"""
+        if not 0 <= ply <= len(self):
+            raise IndexError(f"No ply {ply} in a history of {len(self)}")
+        keyframe = ply // KEYFRAME_INTERVAL
+        position = bytearray(self.keyframes[keyframe])
+        for step in range(keyframe * KEYFRAME_INTERVAL + 1, ply + 1):
+            self._apply(position, step)
+        return bytes(position)
+
+    def seek(self, ply):
+        """Moves to a ply and returns its encoded position"""
+        if ply == self.ply - 1 and ply >= 0:
+            self._apply(self.current, self.ply, forward=False)
+        elif ply == self.ply + 1 and ply <= len(self):
+            self._apply(self.current, ply)
+        elif ply != self.ply:
+            self.current[:] = self.position(ply)
+        self.ply = ply
+        return bytes(self.current)
+
+    def can_undo(self):
+        return self.ply > 0
+
+    def can_redo(self):
+        return self.ply < len(self)
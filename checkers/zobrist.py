@@ -0,0 +1,43 @@
+"""
+Zobrist hashing of board positions
+
+Every (square, piece state) pair gets a fixed random 64-bit key and a position
+hashes to the XOR of the keys of its pieces and a key for the board size, so
+positions on different boards never share table entries. The generator is
+seeded, so hashes agree between processes and runs.
+"""
+import random
+from .constants import BOARD_SIZES, WHITE, ELEMENTS
+
+_random = random.Random(0x5EED)
+
+# Piece states: color x king x element (or none) x power used
+_ELEMENT_INDEX = {element: index for index, element in enumerate([None] + ELEMENTS)}
+PIECE_STATES = 2 * 2 * len(_ELEMENT_INDEX) * 2
+
+# Enough squares for the largest board; square index is row * cols + col
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(PIECE_STATES)] for _ in range(max(BOARD_SIZES) ** 2)]
+# Mixed in when White is to move, for tables where the side to move matters
+WHITE_TO_MOVE = _random.getrandbits(64)
+# Mixed into every hash; drawn after the other keys so those stay the same
+SIZE_KEYS = {size: _random.getrandbits(64) for size in BOARD_SIZES}
+
+
+def piece_state(piece):
+    """Returns the index of a piece's color, king, element and power-used state"""
+    state = _ELEMENT_INDEX[piece.element_power]
+    state = state * 2 + piece.power_used
+    state = state * 2 + piece.king
+    return state * 2 + (piece.color == WHITE)
+
+
+def position_hash(board, turn=None):
+    """Returns the 64-bit Zobrist hash of a board's size and pieces, including the side to move if turn is given"""
+    key = SIZE_KEYS[board.rows] ^ (WHITE_TO_MOVE if turn == WHITE else 0)
+    square = 0
+    for row in board.board:
+        for piece in row:
+            if piece != 0:
+                key ^= PIECE_KEYS[square][piece_state(piece)]
+            square += 1
+    return key
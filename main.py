@@ -1,30 +1,109 @@
 import pygame
 from checkers.constants import WIDTH, HEIGHT, BOARD_HEIGHT, INFO_HEIGHT, SQUARE_SIZE, BLACK, WHITE, CREAM, BROWN, \
-    LIGHT_GREY, ELEMENTS
+    LIGHT_GREY, ELEMENTS, DRAW, BOARD_SIZES
 from checkers.game import Game
-from minimax.algorithm import minimax
+from checkers.fonts import get_font, render_text
+from checkers.piece import build_sprite_atlas
+from checkers.profiling import Profiler
+from checkers.record import RecordWriter, square_coords
+from minimax.algorithm import minimax, SearchInfo
+from minimax.pns import solve, is_endgame
+from minimax.hints import Hints
+from minimax.trace import SearchTrace
+import os
 import sys
+import time
 
 FPS = 60
+# Block on input instead of redrawing at a fixed FPS
+EVENT_DRIVEN = True
+# Longest time (ms) to sleep waiting for input before re-checking game state
+IDLE_TIMEOUT = 500
+# Append every finished or abandoned game to this file when set
+RECORD_FILE = os.environ.get('CHECKERS_RECORD_FILE')
+# The S key saves the game in progress here and the L key loads it back
+SAVE_FILE = os.environ.get('CHECKERS_SAVE_FILE', 'checkers.sav')
+# Print frame time statistics when leaving a game if set
+FRAME_STATS = bool(os.environ.get('CHECKERS_FRAME_STATS'))
+# Every AI search is traced to the file CHECKERS_TRACE names (see minimax.trace)
+SEARCH_TRACE = SearchTrace.from_env()
+# Square highlight for the first, second and third hint
+HINT_COLORS = [(255, 215, 0), (192, 192, 192), (205, 127, 50)]
 WIN = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption('Elemental Checkers')
 
 
-def get_row_col_from_mouse(pos):
+def get_row_col_from_mouse(pos, board):
     x, y = pos
-    row = y // SQUARE_SIZE
-    col = x // SQUARE_SIZE
+    row = y // board.square_size
+    col = x // board.square_size
     # Only register clicks within the board area
-    if row < 8 and col < 8:
+    if row < board.rows and col < board.cols:
         return row, col
     return None, None
 
-def draw_menu(win):
-    """Draw the initial menu screen with game mode options"""
+def wait_for_events(timeout):
+    """Returns pending events, blocking up to timeout ms for the first one when timeout is positive"""
+    if timeout <= 0:
+        return pygame.event.get()
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+
+def name_players(game, ai_mode, ai_depth):
+    """Fills in the player tags of the game record"""
+    game.record.tags['Black'] = 'Human'
+    game.record.tags['White'] = f'AI (depth {ai_depth})' if ai_mode else 'Human'
+
+
+def save_record(game):
+    """Appends the game record to RECORD_FILE if recording is enabled and a move was made"""
+    if RECORD_FILE and game.record.moves:
+        with RecordWriter(RECORD_FILE) as writer:
+            writer.write(game.record)
+
+
+class FrameTimer:
+    """Tracks how long each redraw takes so the achieved frame time can be reported"""
+
+    def __init__(self):
+        self.frames = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.started = time.perf_counter()
+        self.frame_started = None
+
+    def start(self):
+        """Marks the start of a frame"""
+        self.frame_started = time.perf_counter()
+
+    def stop(self):
+        """Marks the end of the frame started last"""
+        self.record(time.perf_counter() - self.frame_started)
+
+    def record(self, seconds):
+        """Adds the duration of one drawn frame"""
+        self.frames += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+
+    def report(self):
+        """Prints the average and worst frame time and the number of frames drawn, if FRAME_STATS is set"""
+        if not FRAME_STATS or not self.frames:
+            return
+        elapsed = time.perf_counter() - self.started
+        print(f"Drew {self.frames} frames in {elapsed:.1f}s: "
+              f"avg {self.total / self.frames * 1000:.2f} ms, worst {self.worst * 1000:.2f} ms per frame")
+
+
+def draw_menu(win, board_size):
+    """Draw the initial menu screen with game mode and board size options"""
     # Initialize fonts
-    title_font = pygame.font.SysFont('Arial', 48)
-    option_font = pygame.font.SysFont('Arial', 32)
-    instruction_font = pygame.font.SysFont('Arial', 24)
+    title_font = get_font(48)
+    option_font = get_font(32)
+    instruction_font = get_font(24)
 
     # Fill background
     win.fill(CREAM)
@@ -40,43 +119,49 @@ def draw_menu(win):
     win.blit(overlay, (0, 0))
 
     # Draw title
-    title = title_font.render("ELEMENTAL CHECKERS", True, (0, 0, 0))
+    title = render_text(title_font, "ELEMENTAL CHECKERS", (0, 0, 0))
     win.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
 
     # Draw game mode options
-    mode_text = option_font.render("Select Game Mode:", True, (0, 0, 0))
+    mode_text = render_text(option_font, "Select Game Mode:", (0, 0, 0))
     win.blit(mode_text, (WIDTH // 2 - mode_text.get_width() // 2, 200))
 
     # Human vs AI button
     pygame.draw.rect(win, (200, 200, 200), (WIDTH // 2 - 150, 250, 300, 50))
-    ai_text = option_font.render("Human vs AI", True, (0, 0, 0))
+    ai_text = render_text(option_font, "Human vs AI", (0, 0, 0))
     win.blit(ai_text, (WIDTH // 2 - ai_text.get_width() // 2, 260))
 
     # Human vs Human button
     pygame.draw.rect(win, (200, 200, 200), (WIDTH // 2 - 150, 320, 300, 50))
-    human_text = option_font.render("Human vs Human", True, (0, 0, 0))
+    human_text = render_text(option_font, "Human vs Human", (0, 0, 0))
     win.blit(human_text, (WIDTH // 2 - human_text.get_width() // 2, 330))
 
+    # Board size button (cycles through the supported sizes)
+    pygame.draw.rect(win, (200, 200, 200), (WIDTH // 2 - 150, 390, 300, 50))
+    size_text = render_text(option_font, f"Board: {board_size}x{board_size}", (0, 0, 0))
+    win.blit(size_text, (WIDTH // 2 - size_text.get_width() // 2, 400))
+
     # Draw instructions
-    instructions = instruction_font.render("Choose a game mode to begin", True, (0, 0, 0))
-    win.blit(instructions, (WIDTH // 2 - instructions.get_width() // 2, 400))
+    instructions = render_text(instruction_font, "Choose a game mode to begin", (0, 0, 0))
+    win.blit(instructions, (WIDTH // 2 - instructions.get_width() // 2, 470))
 
     # Draw version information and credits
-    version_text = instruction_font.render("Version 1.0", True, (0, 0, 0))
+    version_text = render_text(instruction_font, "Version 1.0", (0, 0, 0))
     win.blit(version_text, (WIDTH - version_text.get_width() - 20, HEIGHT - version_text.get_height() - 20))
 
     return {
         'ai_button': pygame.Rect(WIDTH // 2 - 150, 250, 300, 50),
-        'human_button': pygame.Rect(WIDTH // 2 - 150, 320, 300, 50)
+        'human_button': pygame.Rect(WIDTH // 2 - 150, 320, 300, 50),
+        'size_button': pygame.Rect(WIDTH // 2 - 150, 390, 300, 50)
     }
 
 
 def draw_difficulty_menu(win):
     """Draw the AI difficulty selection menu"""
     # Initialize fonts
-    title_font = pygame.font.SysFont('Arial', 48)
-    option_font = pygame.font.SysFont('Arial', 32)
-    instruction_font = pygame.font.SysFont('Arial', 24)
+    title_font = get_font(48)
+    option_font = get_font(32)
+    instruction_font = get_font(24)
 
     # Fill background
     win.fill(CREAM)
@@ -92,7 +177,7 @@ def draw_difficulty_menu(win):
     win.blit(overlay, (0, 0))
 
     # Draw title
-    title = title_font.render("Select AI Difficulty", True, (0, 0, 0))
+    title = render_text(title_font, "Select AI Difficulty", (0, 0, 0))
     win.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
 
     difficulty_buttons = {}
@@ -102,18 +187,18 @@ def draw_difficulty_menu(win):
         button_rect = pygame.Rect(WIDTH // 2 - 100, 200 + (i * 80), 200, 50)
         pygame.draw.rect(win, (200, 200, 200), button_rect)
 
-        text = option_font.render(label, True, (0, 0, 0))
+        text = render_text(option_font, label, (0, 0, 0))
         win.blit(text, (WIDTH // 2 - text.get_width() // 2, 210 + (i * 80)))
 
         difficulty_buttons[label] = button_rect
 
-    instructions = instruction_font.render("Choose a difficulty level", True, (0, 0, 0))
+    instructions = render_text(instruction_font, "Choose a difficulty level", (0, 0, 0))
     win.blit(instructions, (WIDTH // 2 - instructions.get_width() // 2, 450))
 
     # Add back button
     back_button = pygame.Rect(20, HEIGHT - 60, 100, 40)
     pygame.draw.rect(win, (200, 200, 200), back_button)
-    back_text = instruction_font.render("Back", True, (0, 0, 0))
+    back_text = render_text(instruction_font, "Back", (0, 0, 0))
     win.blit(back_text, (20 + (100 - back_text.get_width()) // 2, HEIGHT - 60 + (40 - back_text.get_height()) // 2))
     
     difficulty_buttons['back'] = back_button
@@ -130,41 +215,62 @@ def draw_info_panel(win, ai_mode, current_player, game_over=False, fire_active=F
     pygame.draw.line(win, BLACK, (0, BOARD_HEIGHT), (WIDTH, BOARD_HEIGHT), 2)
 
     # Initialize font
-    info_font = pygame.font.SysFont('Arial', 20)
+    info_font = get_font(20)
 
     # Show game mode
     if ai_mode:
-        mode_text = info_font.render("Mode: Human (Black) vs AI (White)", True, BLACK)
+        mode_text = render_text(info_font, "Mode: Human (Black) vs AI (White)", BLACK)
     else:
-        mode_text = info_font.render("Mode: Human vs Human", True, BLACK)
+        mode_text = render_text(info_font, "Mode: Human vs Human", BLACK)
 
     win.blit(mode_text, (20, BOARD_HEIGHT + 15))
 
     # Show current player's turn
     if not game_over:
-        turn_text = info_font.render(f"Current turn: {current_player}", True, BLACK)
+        turn_text = render_text(info_font, f"Current turn: {current_player}", BLACK)
         win.blit(turn_text, (20, BOARD_HEIGHT + 45))
 
     # Show fire ability hint if active
     if fire_active:
-        fire_text = info_font.render("Fire power ready! Click piece again to capture adjacent enemy", True, (255, 0, 0))
+        fire_text = render_text(info_font, "Fire power ready! Click piece again to capture adjacent enemy", (255, 0, 0))
         win.blit(fire_text, (20, BOARD_HEIGHT + 65))
 
     # Show restart instruction
-    restart_text = info_font.render("Press R to restart game", True, BLACK)
+    restart_text = render_text(info_font, "Press R to restart game", BLACK)
     win.blit(restart_text, (WIDTH - 200, BOARD_HEIGHT + 15))
     
     # Show menu instruction
-    menu_text = info_font.render("Press M for main menu", True, BLACK)
+    menu_text = render_text(info_font, "Press M for main menu", BLACK)
     win.blit(menu_text, (WIDTH - 200, BOARD_HEIGHT + 45))
 
 
+def draw_hints(win, hints, board):
+    """Outlines the start and end squares of each hinted move, labelled with its rank and score"""
+    label_font = get_font(16)
+    size = board.square_size
+    # Draw the weakest hint first so the best one ends up on top
+    for rank in reversed(range(len(hints))):
+        move, score = hints[rank]
+        color = HINT_COLORS[rank % len(HINT_COLORS)]
+        (start_row, start_col), (end_row, end_col) = square_coords(move.start, board.cols), square_coords(move.end, board.cols)
+        start = (start_col * size + size // 2, start_row * size + size // 2)
+        end = (end_col * size + size // 2, end_row * size + size // 2)
+
+        pygame.draw.rect(win, color, (start_col * size, start_row * size, size, size), 3)
+        pygame.draw.rect(win, color, (end_col * size, end_row * size, size, size), 3)
+        if start != end:
+            pygame.draw.line(win, color, start, end, 4)
+
+        label = render_text(label_font, f"{rank + 1}: {score:+.2f}", BLACK)
+        win.blit(label, (end_col * size + 4, end_row * size + 4 + rank * label.get_height()))
+
+
 def draw_help_screen(win):
     """Draw the help screen with game rules and element powers"""
     # Initialize fonts
-    title_font = pygame.font.SysFont('Arial', 36)
-    subtitle_font = pygame.font.SysFont('Arial', 28)
-    content_font = pygame.font.SysFont('Arial', 20)
+    title_font = get_font(36)
+    subtitle_font = get_font(28)
+    content_font = get_font(20)
 
     # Fill background
     win.fill(CREAM)
@@ -175,11 +281,11 @@ def draw_help_screen(win):
     win.blit(overlay, (0, 0))
 
     # Draw title
-    title = title_font.render("ELEMENTAL CHECKERS GUIDE", True, (0, 0, 0))
+    title = render_text(title_font, "ELEMENTAL CHECKERS GUIDE", (0, 0, 0))
     win.blit(title, (WIDTH // 2 - title.get_width() // 2, 30))
 
     # Draw basic rules
-    rules_title = subtitle_font.render("Basic Rules:", True, (0, 0, 0))
+    rules_title = render_text(subtitle_font, "Basic Rules:", (0, 0, 0))
     win.blit(rules_title, (50, 80))
 
     rules = [
@@ -191,11 +297,11 @@ def draw_help_screen(win):
     ]
 
     for i, rule in enumerate(rules):
-        rule_text = content_font.render(rule, True, (0, 0, 0))
+        rule_text = render_text(content_font, rule, (0, 0, 0))
         win.blit(rule_text, (70, 120 + i * 25))
 
     # Draw elemental powers
-    powers_title = subtitle_font.render("Elemental Powers:", True, (0, 0, 0))
+    powers_title = render_text(subtitle_font, "Elemental Powers:", (0, 0, 0))
     win.blit(powers_title, (50, 250))
 
     powers = [
@@ -206,30 +312,33 @@ def draw_help_screen(win):
     ]
 
     for i, power in enumerate(powers):
-        power_text = content_font.render(power, True, (0, 0, 0))
+        power_text = render_text(content_font, power, (0, 0, 0))
         win.blit(power_text, (70, 290 + i * 25))
 
     # Draw controls
-    controls_title = subtitle_font.render("Controls:", True, (0, 0, 0))
+    controls_title = render_text(subtitle_font, "Controls:", (0, 0, 0))
     win.blit(controls_title, (50, 420))
 
     controls = [
         "• Click to select and move pieces",
         "• Click a piece with fire power twice to use it",
-        "• R: Restart game",
-        "• M: Return to main menu",
+        "• R / M: Restart game or return to main menu",
         "• H: Show this help screen",
+        "• T: Show move hints",
+        "• P: Profile the next AI moves (or frames)",
+        "• S / L: Save or load the game",
+        "• U / Y: Undo or redo a move (Home / End: first or last move)",
         "• Esc: Exit game"
     ]
 
     for i, control in enumerate(controls):
-        control_text = content_font.render(control, True, (0, 0, 0))
-        win.blit(control_text, (70, 460 + i * 25))
+        control_text = render_text(content_font, control, (0, 0, 0))
+        win.blit(control_text, (70, 460 + i * 20))
 
     # Add back button
     back_button = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 60, 150, 40)
     pygame.draw.rect(win, (200, 200, 200), back_button)
-    back_text = content_font.render("Back to Game", True, (0, 0, 0))
+    back_text = render_text(content_font, "Back to Game", (0, 0, 0))
     win.blit(back_text, (WIDTH // 2 - back_text.get_width() // 2, HEIGHT - 60 + (40 - back_text.get_height()) // 2))
 
     return back_button
@@ -241,7 +350,8 @@ def menu_screen():
     clock = pygame.time.Clock()
 
     # First menu - game mode selection
-    buttons = draw_menu(WIN)
+    board_size = BOARD_SIZES[0]
+    buttons = draw_menu(WIN, board_size)
     pygame.display.update()
 
     # Game settings
@@ -253,15 +363,20 @@ def menu_screen():
 
     running = True
     while running:
-        clock.tick(FPS)
-
-        for event in pygame.event.get():
+        if EVENT_DRIVEN:
+            # The menu only changes on input, so block until some arrives
+            events = wait_for_events(IDLE_TIMEOUT)
+        else:
+            clock.tick(FPS)
+            events = pygame.event.get()
+
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
+                mouse_pos = event.pos
 
                 if menu_state == "main":
                     if buttons['ai_button'].collidepoint(mouse_pos):
@@ -270,6 +385,11 @@ def menu_screen():
                         difficulty_buttons = draw_difficulty_menu(WIN)
                         pygame.display.update()
 
+                    elif buttons['size_button'].collidepoint(mouse_pos):
+                        board_size = BOARD_SIZES[(BOARD_SIZES.index(board_size) + 1) % len(BOARD_SIZES)]
+                        buttons = draw_menu(WIN, board_size)
+                        pygame.display.update()
+
                     elif buttons['human_button'].collidepoint(mouse_pos):
                         ai_mode = False
                         running = False  # Exit menu and start game
@@ -277,7 +397,7 @@ def menu_screen():
                 elif menu_state == "difficulty":
                     if 'back' in difficulty_buttons and difficulty_buttons['back'].collidepoint(mouse_pos):
                         menu_state = "main"
-                        buttons = draw_menu(WIN)
+                        buttons = draw_menu(WIN, board_size)
                         pygame.display.update()
                         continue
                         
@@ -291,15 +411,16 @@ def menu_screen():
                                 ai_depth = 5
                             running = False  # Exit menu and start game
 
-    return ai_mode, ai_depth
+    return ai_mode, ai_depth, board_size
 
 
 def main():
     # Initialize pygame
     pygame.init()
+    build_sprite_atlas()
     
     # Show menu and get settings
-    ai_mode, ai_depth = menu_screen()
+    ai_mode, ai_depth, board_size = menu_screen()
 
     # Default AI depth if somehow skipped
     if ai_mode and ai_depth is None:
@@ -308,7 +429,8 @@ def main():
     # Initialize game
     run = True
     clock = pygame.time.Clock()
-    game = Game(WIN)
+    game = Game(WIN, board_size)
+    name_players(game, ai_mode, ai_depth)
 
     # Game state
     game_over = False
@@ -316,55 +438,94 @@ def main():
 
     # Text rendering setup
     pygame.font.init()
-    font = pygame.font.SysFont('Arial', 32)
-    small_font = pygame.font.SysFont('Arial', 20)
+    font = get_font(32)
+    small_font = get_font(20)
+
+
+    # Redraw only when something changed
+    dirty = True
+    frame_timer = FrameTimer()
+    # Armed by CHECKERS_PROFILE or the P key
+    profiler = Profiler.from_env()
 
+    # Best moves for the human player, searched in the background while they think
+    hints = Hints()
+    show_hints = False
+    current_hints = None
 
     while run:
-        clock.tick(FPS)
+        ai_pending = game.turn == WHITE and not game_over and ai_mode and not game.earth_power_active and not show_help
+        if EVENT_DRIVEN:
+            # Sleep until input arrives; never block when a redraw or AI move is pending
+            events = wait_for_events(0 if dirty or ai_pending else IDLE_TIMEOUT)
+        else:
+            clock.tick(FPS)
+            events = pygame.event.get()
+            dirty = True
+
+        # Mouse motion alone never changes what is on screen
+        if any(event.type != pygame.MOUSEMOTION for event in events):
+            dirty = True
 
         # Check for winner
         winner = game.winner()
         if winner is not None and not game_over:
             game_over = True
-            winner_text = f"{'Black' if winner == BLACK else 'White'} Wins!"
-            text_surface = font.render(winner_text, True, (255, 0, 0))
+            dirty = True
+            save_record(game)
+            if winner == DRAW:
+                winner_text = "Draw!"
+            else:
+                winner_text = f"{'Black' if winner == BLACK else 'White'} Wins!"
+            text_surface = render_text(font, winner_text, (255, 0, 0))
             text_rect = text_surface.get_rect(center=(WIDTH // 2, BOARD_HEIGHT // 2))
-            restart_text = small_font.render("Press R to restart", True, (0, 0, 0))
+            restart_text = render_text(small_font, "Press R to restart", (0, 0, 0))
             restart_rect = restart_text.get_rect(center=(WIDTH // 2, BOARD_HEIGHT // 2 + 40))
 
         # Handle Earth power dialog if active
         if game.earth_power_active:
-            yes_button, no_button = game.draw_earth_power_dialog(WIN)
-            for event in pygame.event.get():
+            if dirty:
+                frame_timer.start()
+                yes_button, no_button = game.draw_earth_power_dialog(WIN)
+                pygame.display.update()
+                frame_timer.stop()
+                dirty = False
+            for event in events:
                 if event.type == pygame.QUIT:
                     run = False
                     break
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
+                    mouse_pos = event.pos
                     if yes_button.collidepoint(mouse_pos):
                         game.handle_earth_power_choice(True)
+                        dirty = True
                     elif no_button.collidepoint(mouse_pos):
                         game.handle_earth_power_choice(False)
+                        dirty = True
             # Skip the rest of the loop while dialog is active
-            pygame.display.update()
             continue
 
         # Show help screen if active
         if show_help:
-            back_button = draw_help_screen(WIN)
-            for event in pygame.event.get():
+            if dirty:
+                frame_timer.start()
+                back_button = draw_help_screen(WIN)
+                pygame.display.update()
+                frame_timer.stop()
+                dirty = False
+            for event in events:
                 if event.type == pygame.QUIT:
                     run = False
                     break
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_h or event.key == pygame.K_ESCAPE:
                         show_help = False
+                        dirty = True
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
+                    mouse_pos = event.pos
                     if back_button.collidepoint(mouse_pos):
                         show_help = False
-            pygame.display.update()
+                        dirty = True
             continue
 
         # AI move when it's white's turn, game is not over, and in AI mode
@@ -375,25 +536,81 @@ def main():
             draw_info_panel(WIN, ai_mode, "White (AI thinking...)", game_over)
             pygame.display.update()
 
-            # Run minimax with alpha-beta pruning
-            value, new_board = minimax(game.get_board(), ai_depth, True, game)
-            game.ai_move(new_board)
-
-        for event in pygame.event.get():
+            # Run minimax with alpha-beta pruning (alone: a hint search would only slow it down)
+            hints.cancel()
+            # In endgames a proven win (or the longest defence of a proven loss) beats a fixed-depth search
+            with profiler.capture('ai'):
+                solution = None
+                if is_endgame(game.get_board()):
+                    solution = solve(game.get_board(), WHITE, SearchInfo(history=game.history.copy()))
+                if solution and solution.line:
+                    new_board = solution.line[0]
+                elif SEARCH_TRACE:
+                    SEARCH_TRACE.begin(game.get_board(), WHITE, ai_depth)
+                    info = SearchInfo(history=game.history.copy(), trace=SEARCH_TRACE)
+                    value, new_board = minimax(game.get_board(), ai_depth, True, game, info=info)
+                    SEARCH_TRACE.flush()
+                else:
+                    value, new_board = minimax(game.get_board(), ai_depth, True, game)
+                game.ai_move(new_board)
+            dirty = True
+
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
 
             if event.type == pygame.KEYDOWN:
                 # Restart game with R key
                 if event.key == pygame.K_r:
+                    if not game_over:
+                        save_record(game)
+                    hints.cancel()
                     game.reset()
+                    name_players(game, ai_mode, ai_depth)
                     game_over = False
                 # Return to main menu with M key
                 elif event.key == pygame.K_m:
+                    if not game_over:
+                        save_record(game)
+                    hints.cancel()
+                    frame_timer.report()
                     return main()
                 # Show help screen with H key
                 elif event.key == pygame.K_h:
                     show_help = True
+                # Toggle move hints with T key
+                elif event.key == pygame.K_t:
+                    show_hints = not show_hints
+                # Save the game with S key and load it back with L key
+                elif event.key == pygame.K_s:
+                    game.save(SAVE_FILE)
+                elif event.key == pygame.K_l and os.path.exists(SAVE_FILE):
+                    hints.cancel()
+                    try:
+                        game.load(SAVE_FILE)
+                        game_over = False
+                    except ValueError as error:
+                        # Keep playing the current game rather than crash on a damaged save
+                        print(error)
+                # Undo and redo with U and Y keys; Home and End go to the first and last move.
+                # Against the AI they step over its moves, so it is the human's turn afterwards
+                elif event.key in (pygame.K_u, pygame.K_y, pygame.K_HOME, pygame.K_END):
+                    hints.cancel()
+                    if event.key == pygame.K_u:
+                        game.undo()
+                        while ai_mode and game.turn == WHITE and game.undo():
+                            pass
+                    elif event.key == pygame.K_y:
+                        game.redo()
+                        while ai_mode and game.turn == WHITE and game.redo():
+                            pass
+                    else:
+                        game.seek(0 if event.key == pygame.K_HOME else len(game.timeline))
+                    game_over = False
+                # Profile the next AI moves (frames without an AI) with P key
+                elif event.key == pygame.K_p:
+                    if not profiler.active:
+                        profiler.arm('ai' if ai_mode else 'frames')
                 # Exit game with Esc key
                 elif event.key == pygame.K_ESCAPE:
                     if show_help:
@@ -402,8 +619,8 @@ def main():
                         run = False
 
             if event.type == pygame.MOUSEBUTTONDOWN and not game_over and not show_help:
-                pos = pygame.mouse.get_pos()
-                row, col = get_row_col_from_mouse(pos)
+                pos = event.pos
+                row, col = get_row_col_from_mouse(pos, game.board)
 
                 # Only process clicks on the board
                 if row is not None and col is not None:
@@ -415,20 +632,43 @@ def main():
                     else:
                         game.select(row, col)
 
-        # Update game board
-        game.update()
+        # Hints are for a human at the start of their turn (not in the middle of a multi-capture)
+        human_turn = not ai_mode or game.turn == BLACK
+        if show_hints and human_turn and not game_over and not game.earth_power_active and not game.capture_continues:
+            current_hints = hints.request(game)
+        else:
+            current_hints = None
+
+        # Dialogs and the help screen draw themselves on the next pass
+        if not dirty or game.earth_power_active or show_help:
+            continue
 
-        # Display current mode and player turn in info panel
-        current_player = "Black" if game.turn == BLACK else "White"
-        draw_info_panel(WIN, ai_mode, current_player, game_over)
+        frame_timer.start()
+
+        with profiler.capture('frames'):
+            # Update game board
+            game.update()
 
-        # Draw winner text if game is over
-        if game_over:
-            WIN.blit(text_surface, text_rect)
-            WIN.blit(restart_text, restart_rect)
+            if current_hints:
+                draw_hints(WIN, current_hints, game.board)
 
-        pygame.display.update()
+            # Display current mode and player turn in info panel
+            current_player = "Black" if game.turn == BLACK else "White"
+            draw_info_panel(WIN, ai_mode, current_player, game_over)
 
+            # Draw winner text if game is over
+            if game_over:
+                WIN.blit(text_surface, text_rect)
+                WIN.blit(restart_text, restart_rect)
+
+            pygame.display.update()
+        frame_timer.stop()
+        dirty = False
+
+    if not game_over:
+        save_record(game)
+    hints.cancel()
+    frame_timer.report()
     pygame.quit()
     sys.exit()
 
@@ -1,15 +1,125 @@
+import json
+import math
+import os
 import pygame
-from copy import deepcopy
+import time
 from checkers.constants import WHITE, BLACK
+from checkers.symmetry import canonical_hash
+from .eval_cache import EvalCache
+
+# How many nodes to search between clock checks
+TIME_CHECK_INTERVAL = 64
+
+# Evaluation weights, overridden at startup by WEIGHTS_FILE (written by minimax.tuning)
+# Regular pieces are worth 1.0, kings 2.0 and an unused power 0.5 (+0.03 positional bonus)
+# Position terms are weighted at 0.01 per unit (-0.02 for edge pieces), mobility at 0.1 per move
+DEFAULT_WEIGHTS = {
+    'men': 1.0,
+    'kings': 2.0,
+    'powers': 0.53,
+    'promotion_distance': 0.01,
+    'centralization': 0.01,
+    'edges': -0.02,
+    'mobility': 0.1,
+}
+FEATURES = list(DEFAULT_WEIGHTS)
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weights.json')
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """Returns the evaluation weights from a JSON file, falling back to DEFAULT_WEIGHTS for missing terms"""
+    weights = dict(DEFAULT_WEIGHTS)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as file:
+            weights.update((name, float(value)) for name, value in json.load(file).items() if name in weights)
+    return weights
+
+
+WEIGHTS = load_weights()
+WEIGHT_VECTOR = [WEIGHTS[name] for name in FEATURES]
+# Static evaluations shared by every search in this process
+EVAL_CACHE = EvalCache()
+
+# Move kinds, in the order minimax searches them
+CAPTURE, PROMOTION, POWER, QUIET = range(4)
+# Width of the scout window used to test whether a reduced move beats alpha (or beta)
+NULL_WINDOW = 1e-6
+# Score of a position drawn by repetition or by the no-progress rule
+DRAW_SCORE = 0.0
+# Flags of a node's exit in a search trace (see minimax.trace)
+LEAF, TERMINAL, CUTOFF = 1, 2, 4
+
+
+class SearchConfig:
+    """
+    Pruning settings for minimax
+
+    - Late move reductions: quiet moves after the first full_depth_moves are searched
+      shallower with a null window, and re-searched at full depth if they beat the
+      current bound. The reduction starts at reduction plies and grows with
+      log(depth) * log(move number) / reduction_divisor
+    - Futility pruning: at depths listed in futility_margins, quiet moves are skipped
+      when the static evaluation plus the margin cannot reach the current bound
+    - Captures and promotions are never reduced or pruned, and power moves only with
+      prune_power_moves. Captures are optional in the search, so quiet moves are still
+      pruned when a capture is available; clear prune_when_capture_available to search
+      every move of such positions at full depth
+    """
 
-def __deepcopy__(self, memo):
-    new_piece = Piece(self.row, self.col, self.color)
-    new_piece.king = self.king
-    new_piece.element_power = self.element_power
-    new_piece.power_used = self.power_used
-    return new_piece
-    
-def minimax(board, depth, max_player, game, alpha=float('-inf'), beta=float('inf')):
+    def __init__(self, reductions=True, reduction_depth=3, full_depth_moves=2, reduction=1, reduction_divisor=1.0,
+                 futility=True, futility_margins=None, prune_power_moves=False,
+                 prune_when_capture_available=True):
+        self.reductions = reductions
+        self.reduction_depth = reduction_depth
+        self.full_depth_moves = full_depth_moves
+        self.reduction = reduction
+        self.reduction_divisor = reduction_divisor
+        self.futility = futility
+        # Margins in pieces, by remaining depth
+        self.futility_margins = futility_margins if futility_margins is not None else {1: 0.5, 2: 1.0, 3: 1.5}
+        self.prune_power_moves = prune_power_moves
+        self.prune_when_capture_available = prune_when_capture_available
+
+
+DEFAULT_CONFIG = SearchConfig()
+# Searches every move at full depth, like minimax before pruning was added
+FULL_WIDTH = SearchConfig(reductions=False, futility=False)
+
+
+class SearchAborted(Exception):
+    """Raised inside minimax when a search is stopped or runs out of time or nodes"""
+
+
+class SearchInfo:
+    """Node counter, limits and stop flag shared by every node of one search"""
+
+    def __init__(self, max_nodes=None, movetime=None, config=None, history=None, trace=None):
+        self.nodes = 0
+        self.config = config or DEFAULT_CONFIG
+        # PositionHistory of the game so far; the search pushes and pops the positions it visits
+        self.history = history
+        # minimax.trace.SearchTrace recording the nodes searched
+        self.trace = trace
+        self.max_nodes = max_nodes
+        self.started = time.perf_counter()
+        self.deadline = self.started + movetime if movetime is not None else None
+        self.stopped = False
+
+    def visit(self):
+        """Counts a node and aborts the search once a limit is hit"""
+        self.nodes += 1
+        if self.stopped or (self.max_nodes is not None and self.nodes > self.max_nodes):
+            raise SearchAborted
+        if self.deadline is not None and self.nodes % TIME_CHECK_INTERVAL == 0 \
+                and time.perf_counter() >= self.deadline:
+            self.stopped = True
+            raise SearchAborted
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def minimax(board, depth, max_player, game, alpha=float('-inf'), beta=float('inf'), info=None):
     """
     Implementation of minimax algorithm with alpha-beta pruning for checkers
 
@@ -20,60 +130,242 @@ def minimax(board, depth, max_player, game, alpha=float('-inf'), beta=float('inf
         game: Game instance for accessing game state
         alpha: Alpha value for pruning
         beta: Beta value for pruning
+        info: Optional SearchInfo that counts nodes, enforces limits and holds the SearchConfig,
+              position history (taken from game when not given) and trace
 
     Returns:
         tuple: (evaluation, best_board)
     """
+    if info is None and game is not None:
+        # Search on a copy of the game's history so repetitions can be recognized
+        info = SearchInfo(history=game.history.copy())
+    if info is not None:
+        info.visit()
+    trace = info.trace if info is not None else None
+    if trace is not None:
+        trace.enter(depth, alpha, beta)
+
     if depth == 0 or board.winner() is not None:
-        return evaluate(board), board
+        evaluation = evaluate(board)
+        if trace is not None:
+            trace.exit(evaluation, LEAF if depth == 0 else TERMINAL)
+        return evaluation, board
+
+    config = info.config if info is not None else DEFAULT_CONFIG
+    moves = get_ordered_moves(board, WHITE if max_player else BLACK)
+    # Moves are sorted captures first, so a forced-capture position shows up as a leading capture
+    prunable = config.prune_when_capture_available or not moves or moves[0][0] != CAPTURE
+    margin = config.futility_margins.get(depth) if prunable and config.futility else None
+    static_eval = evaluate(board) if margin is not None else None
+    pruned = 0
 
     if max_player:
         max_eval = float('-inf')
         best_move = None
-        for move in get_all_moves(board, WHITE, game):
-            evaluation = minimax(move, depth - 1, False, game, alpha, beta)[0]
+        for index, (kind, piece, destination, skip) in enumerate(moves):
+            # Futility pruning: a quiet move this close to the leaves will not lift the score above alpha
+            if index and static_eval is not None and _is_quiet(kind, config) and static_eval + margin <= alpha:
+                pruned += 1
+                continue
+
+            # Boards are only built for moves that get searched
+            move = simulate_move(piece, destination, board, game, skip)
+            if trace is not None:
+                trace.move(kind, piece, destination)
+            evaluation, reply = _search_move(move, kind, index, depth, True, game, alpha, beta, info, config, prunable)
+            _release(reply, keep=move)
             max_eval = max(max_eval, evaluation)
             if max_eval == evaluation:
+                _release(best_move)
                 best_move = move
+            else:
+                move.release()
 
             alpha = max(alpha, evaluation)
             if beta <= alpha:
                 break
 
+        if trace is not None:
+            trace.exit(max_eval, CUTOFF if beta <= alpha else 0, pruned)
         return max_eval, best_move
     else:
         min_eval = float('inf')
         best_move = None
-        for move in get_all_moves(board, BLACK, game):
-            evaluation = minimax(move, depth - 1, True, game, alpha, beta)[0]
+        for index, (kind, piece, destination, skip) in enumerate(moves):
+            if index and static_eval is not None and _is_quiet(kind, config) and static_eval - margin >= beta:
+                pruned += 1
+                continue
+
+            move = simulate_move(piece, destination, board, game, skip)
+            if trace is not None:
+                trace.move(kind, piece, destination)
+            evaluation, reply = _search_move(move, kind, index, depth, False, game, alpha, beta, info, config, prunable)
+            _release(reply, keep=move)
             min_eval = min(min_eval, evaluation)
             if min_eval == evaluation:
+                _release(best_move)
                 best_move = move
+            else:
+                move.release()
 
             beta = min(beta, evaluation)
             if beta <= alpha:
                 break
 
+        if trace is not None:
+            trace.exit(min_eval, CUTOFF if beta <= alpha else 0, pruned)
         return min_eval, best_move
 
 
+def _is_quiet(kind, config):
+    """Whether a move of this kind may be reduced or pruned"""
+    return kind == QUIET or (kind == POWER and config.prune_power_moves)
+
+
+def _search_move(move, kind, index, depth, max_player, game, alpha, beta, info, config, prunable):
+    """
+    Searches one child of a node for the player max_player
+
+    A child that repeats a position of the game or the search so far, or reaches the
+    no-progress limit, is scored as a draw: one repetition is enough inside the search.
+    """
+    history = info.history if info is not None else None
+    if history is None:
+        return _search_child(move, kind, index, depth, max_player, game, alpha, beta, info, config, prunable)
+
+    history.push(move, BLACK if max_player else WHITE)
+    try:
+        if history.is_draw(repetition_limit=2):
+            return DRAW_SCORE, move
+        return _search_child(move, kind, index, depth, max_player, game, alpha, beta, info, config, prunable)
+    finally:
+        history.pop()
+
+
+def _search_child(move, kind, index, depth, max_player, game, alpha, beta, info, config, prunable):
+    """
+    Searches a child at full depth, or first at reduced depth when it is a late quiet move
+
+    Late quiet moves are first searched at reduced depth with a null window at the
+    current bound; only moves that beat it are searched again at full depth.
+    """
+    if (prunable and config.reductions and depth >= config.reduction_depth
+            and index >= config.full_depth_moves and _is_quiet(kind, config)):
+        reduction = config.reduction + int(math.log(depth) * math.log(index + 1) / config.reduction_divisor)
+        reduced = max(1, depth - 1 - reduction)
+        if max_player:
+            evaluation, reply = minimax(move, reduced, False, game, alpha, alpha + NULL_WINDOW, info)
+            if evaluation <= alpha:
+                return evaluation, reply
+        else:
+            evaluation, reply = minimax(move, reduced, True, game, beta - NULL_WINDOW, beta, info)
+            if evaluation >= beta:
+                return evaluation, reply
+        _release(reply, keep=move)
+
+    return minimax(move, depth - 1, not max_player, game, alpha, beta, info)
+
+
+def _release(board, keep=None):
+    """Hands a discarded search board back to the pool, unless it is None or the board to keep"""
+    if board is not None and board is not keep:
+        board.release()
+
+
+def multi_pv(board, depth, max_player, game, lines=3, info=None):
+    """
+    Ranks the root moves and returns the best `lines` of them, best first
+
+    Runs one iterative-deepening search instead of `lines` separate ones: each depth
+    searches the root moves in the order the previous depth ranked them, with the
+    window bounded by the current lines-th best score, so moves that cannot reach
+    the top lines are cut off like in a normal search.
+
+    Returns:
+        list: (evaluation, board) pairs, at most `lines` long
+    """
+    if info is None:
+        info = SearchInfo(history=game.history.copy() if game is not None else None)
+    config = info.config
+    moves = get_ordered_moves(board, WHITE if max_player else BLACK)
+    prunable = config.prune_when_capture_available or not moves or moves[0][0] != CAPTURE
+    # Root boards are built once and reused by every depth
+    ranked = [(float('-inf') if max_player else float('inf'), kind, simulate_move(piece, destination, board, game, skip))
+              for kind, piece, destination, skip in moves]
+
+    for current in range(1, depth + 1):
+        scored = []
+        try:
+            for index, (_, kind, move) in enumerate(ranked):
+                best = sorted((entry[0] for entry in scored), reverse=max_player)
+                bound = best[lines - 1] if len(best) >= lines else None
+                if max_player:
+                    alpha, beta = (float('-inf') if bound is None else bound), float('inf')
+                else:
+                    alpha, beta = float('-inf'), (float('inf') if bound is None else bound)
+                evaluation, reply = _search_move(move, kind, index, current, max_player, game, alpha, beta, info,
+                                                 config, prunable)
+                _release(reply, keep=move)
+                scored.append((evaluation, kind, move))
+        except SearchAborted:
+            # Keep the last completed ranking
+            break
+        scored.sort(key=lambda entry: entry[0], reverse=max_player)
+        ranked = scored
+
+    for _, _, move in ranked[lines:]:
+        move.release()
+    return [(evaluation, move) for evaluation, _, move in ranked[:lines]]
+
+
+def iterative_deepening(board, max_depth, max_player, game, info=None, on_iteration=None):
+    """
+    Searches depth 1, 2, ... max_depth until the SearchInfo limits stop it
+
+    on_iteration(depth, evaluation, best_board) is called after every completed depth.
+    The first depth always completes, so a move is returned even with tiny limits.
+
+    Returns:
+        tuple: (evaluation, best_board, depth reached)
+    """
+    evaluation = best_board = None
+    for depth in range(1, max_depth + 1):
+        try:
+            evaluation, best_board = minimax(board, depth, max_player, game, info=info)
+        except SearchAborted:
+            if depth > 1:
+                return evaluation, best_board, depth - 1
+            # Finish depth 1 without limits so there is always a move to play
+            evaluation, best_board = minimax(board, 1, max_player, game,
+                                             info=SearchInfo(config=info.config, history=info.history))
+            if on_iteration:
+                on_iteration(1, evaluation, best_board)
+            return evaluation, best_board, 1
+        if on_iteration:
+            on_iteration(depth, evaluation, best_board)
+
+    return evaluation, best_board, max_depth
+
+
 def simulate_move(piece, move, board, game, skip):
     """
     Simulates a move and returns the new board state
     Handles king promotion and multiple jumps
     """
-    board_copy = deepcopy(board)
+    board_copy = board.copy()
     piece_copy = board_copy.get_piece(piece.row, piece.col)
 
-    # Check if skip is a valid list of pieces to skip or an empty list
-    if isinstance(skip, list) and len(skip) > 0 and isinstance(skip[0], str):
-        skip = []  # If it's a string (e.g., 'water_move'), treat skip as empty
+    # A water power backward move is marked by 'water_move' and captures nothing
+    water_move = isinstance(skip, list) and len(skip) > 0 and skip[-1] == 'water_move'
+    if water_move:
+        skip = []
 
     # Check for special elemental power moves
     if isinstance(skip, list) and len(skip) > 0:
         # Earth power move: Check if the skipped piece has earth power and block capture
         if skip[0].element_power == 'earth' and not skip[0].power_used:
-                skip[0].use_power()
+                # Spend the power on the copy; skip holds pieces of the board being searched
+                board_copy.get_piece(skip[0].row, skip[0].col).use_power()
                 board_copy.move(piece_copy, move[0], move[1])
                 return board_copy
 
@@ -97,11 +389,10 @@ def simulate_move(piece, move, board, game, skip):
     board_copy.move(piece_copy, move[0], move[1])
     
     # Handle water power move (if backward move is indicated)
-    if isinstance(skip, list) and len(skip) > 0 and skip[-1] == 'water_move':
+    if water_move:
         if piece_copy.element_power == 'water' and not piece_copy.power_used:
             piece_copy.use_power()
-            skip.pop()  # Remove the water_move marker
-            
+
     # Process captures
     if isinstance(skip, list) and len(skip) > 0 and skip[0] != 'water_move':
         board_copy.remove(skip)
@@ -117,8 +408,10 @@ def simulate_move(piece, move, board, game, skip):
             best_move = max(capture_moves.items(), key=lambda x: len(x[1]))
             move_pos, skipped = best_move
 
-            # Recursively simulate the additional capture
-            return simulate_move(piece_copy, move_pos, board_copy, game, skipped)
+            # Recursively simulate the additional capture; the intermediate board is no longer needed
+            result = simulate_move(piece_copy, move_pos, board_copy, game, skipped)
+            board_copy.release()
+            return result
 
     return board_copy
 
@@ -136,82 +429,106 @@ def get_all_moves(board, color, game):
     return moves
 
 
+def get_ordered_moves(board, color):
+    """
+    Gets all moves for a color as (kind, piece, destination, skip) tuples, ordered
+    captures, promotions, power moves, then quiet moves. Boards are not built here,
+    so moves that get pruned never cost a copy; pass a tuple's last three items to
+    simulate_move to play it.
+    """
+    moves = []
+    for piece in board.get_all_pieces(color):
+        for destination, skip in board.get_valid_moves(piece).items():
+            moves.append((_move_kind(piece, destination, skip, board.rows), piece, destination, skip))
+
+    moves.sort(key=lambda move: move[0])
+    return moves
+
+
+def _move_kind(piece, destination, skip, rows):
+    """Classifies a move from get_valid_moves"""
+    if skip and not isinstance(skip[-1], str):
+        return CAPTURE  # Includes fire captures and captures of earth pieces
+    if not piece.king and destination[0] == (0 if piece.color == BLACK else rows - 1):
+        return PROMOTION
+    if skip:
+        return POWER  # Water power backward move
+    distance = abs(destination[0] - piece.row) + abs(destination[1] - piece.col)
+    if distance == 4 and piece.element_power == 'air' and not piece.power_used:
+        return POWER
+    return QUIET
+
+
 def evaluate(board):
     """
     Evaluates the board state with a more sophisticated evaluation function
     Takes into account:
     - Number of pieces
     - Kings (weighted more heavily)
-    - Position on the board (edges and advancement)
+    - Position on the board (edges, distance to promotion and centralization)
     - Mobility (number of moves available)
     - Elemental powers remaining (pieces with unused powers are worth more)
+    The score is the weighted sum of evaluation_features with WEIGHT_VECTOR,
+    remembered in EVAL_CACHE by canonical position hash: a position and its color
+    flip evaluate to opposite scores, so they share one entry
     """
-    # Basic piece count
-    white_pieces = board.white_left
-    black_pieces = board.red_left
+    key, flipped = canonical_hash(board)
+    evaluation = EVAL_CACHE.get(key)
+    if evaluation is None:
+        evaluation = sum(weight * feature for weight, feature in zip(WEIGHT_VECTOR, evaluation_features(board)))
+        EVAL_CACHE.put(key, -evaluation if flipped else evaluation)
+        return evaluation
+    return -evaluation if flipped else evaluation
 
-    # Get all pieces for more detailed evaluation
-    white_all_pieces = board.get_all_pieces(WHITE)
-    black_all_pieces = board.get_all_pieces(BLACK)
 
-    # King count (weighted more)
-    white_kings = sum(1 for piece in white_all_pieces if piece.king)
-    black_kings = sum(1 for piece in black_all_pieces if piece.king)
-    
-    # Count unused elemental powers (bonus value)
-    white_powers = sum(1 for piece in white_all_pieces if piece.element_power and not piece.power_used)
-    black_powers = sum(1 for piece in black_all_pieces if piece.element_power and not piece.power_used)
+def evaluation_features(board):
+    """Returns the White minus Black value of every term in FEATURES, in that order"""
+    return [white - black for white, black in zip(_side_features(board, WHITE), _side_features(board, BLACK))]
+
 
-    # Calculate positional advantage
-    white_position_value = sum(_get_position_value(piece, WHITE) for piece in white_all_pieces)
-    black_position_value = sum(_get_position_value(piece, BLACK) for piece in black_all_pieces)
+def _side_features(board, color):
+    """Returns the raw FEATURES terms for one side"""
+    pieces = board.get_all_pieces(color)
+    piece_count = board.white_left if color == WHITE else board.red_left
 
-    # Calculate mobility (number of moves available)
-    white_mobility = sum(len(board.get_valid_moves(piece)) for piece in white_all_pieces)
-    black_mobility = sum(len(board.get_valid_moves(piece)) for piece in black_all_pieces)
+    kings = sum(1 for piece in pieces if piece.king)
+    powers = sum(1 for piece in pieces if piece.element_power and not piece.power_used)
 
-    # Final score calculation with weights
-    # Regular pieces are worth 1.0
-    # Kings are worth 2.0
-    # Unused powers are worth 0.5
-    # Position value is weighted at 0.1
-    # Mobility is weighted at 0.1 per move
-    white_score = (white_pieces - white_kings) + (white_kings * 2.0) + (white_powers * 0.5) + (white_position_value * 0.1) + (
-                white_mobility * 0.1)
-    black_score = (black_pieces - black_kings) + (black_kings * 2.0) + (black_powers * 0.5) + (black_position_value * 0.1) + (
-                black_mobility * 0.1)
+    promotion_distance = centralization = edges = 0
+    for piece in pieces:
+        distance, center, edge = _get_position_value(piece, color, board.rows)
+        promotion_distance += distance
+        centralization += center
+        edges += edge
 
-    return white_score - black_score
+    mobility = sum(len(board.get_valid_moves(piece)) for piece in pieces)
 
+    return piece_count - kings, kings, powers, promotion_distance, centralization, edges, mobility
 
-def _get_position_value(piece, color):
+
+def _get_position_value(piece, color, size):
     """
-    Calculates positional value of a piece:
-    - Regular pieces get value for advancing toward the opposite side
-    - Kings get value for being centralized
-    - Pieces on the edge are worth less
+    Calculates the positional terms of a piece on a size x size board:
+    - Regular pieces: rows left before promotion
+    - Kings: how central they are
+    - Whether the piece is on the edge (harder to maneuver)
     """
     row, col = piece.row, piece.col
-    value = 0
+    last = size - 1
+    promotion_distance = centralization = 0
 
-    # Value for regular pieces advancing
     if not piece.king:
         if color == WHITE:
-            value += (7 - row) * 0.1  # More value as white advances upward
+            promotion_distance = last - row  # White promotes on the last row
         else:
-            value += row * 0.1  # More value as black advances downward
+            promotion_distance = row  # Black promotes on row 0
     else:
         # Kings want to be centralized
-        # Calculate distance from center (3.5, 3.5)
-        center_dist = abs(row - 3.5) + abs(col - 3.5)
-        value += (7 - center_dist) * 0.1  # More central = more value
-
-    # Penalty for edge pieces (harder to maneuver)
-    if col == 0 or col == 7 or row == 0 or row == 7:
-        value -= 0.2
-        
-    # Bonus for pieces with unused elemental powers
-    if piece.element_power and not piece.power_used:
-        value += 0.3
-
-    return value
\ No newline at end of file
+        # Calculate distance from center (3.5, 3.5 on 8x8)
+        center = last / 2
+        center_dist = abs(row - center) + abs(col - center)
+        centralization = last - center_dist  # More central = more value
+
+    edge = 1 if col == 0 or col == last or row == 0 or row == last else 0
+
+    return promotion_distance, centralization, edge
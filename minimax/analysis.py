@@ -0,0 +1,159 @@
+"""
+Offline analysis of recorded games
+
+    python -m minimax.analysis games.pdn [more.pdn ...] -o analysis.jsonl --depth 3 --workers 8 [--store positions.db]
+
+Every position of every game is re-searched with minimax across worker processes.
+One JSON line per move is appended to the output with the played and best
+evaluations (from White's point of view), the evaluation lost by the played move,
+a blunder flag and whether the engine agrees with the move. Finished games are
+listed in a checkpoint file, so an interrupted run picks up where it stopped.
+With --store, analyzed games are also added to a position store together with
+their best evaluations.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from checkers.constants import WHITE, BLACK
+from checkers.record import read_records, apply_move, snapshot, describe_move, format_move
+from .algorithm import minimax
+from .position_store import PositionStore
+
+DEFAULT_DEPTH = 3
+# Evaluation lost by a move (in pieces) before it is flagged as a blunder
+BLUNDER_THRESHOLD = 1.0
+
+
+def analyze_game(game_id, record, depth, blunder_threshold):
+    """Re-searches every position of a game and returns one result dict per move"""
+    results = []
+    for ply, (board, turn, move) in enumerate(record.positions()):
+        if move.start is None:
+            # A declined earth power has no move of its own to judge
+            continue
+        max_player = turn == WHITE
+        sign = 1 if max_player else -1
+
+        # Search copies, since the search can mark powers as used on the board it is given
+        best_eval, best_board = minimax(board.copy(), depth, max_player, None)
+
+        played = board.copy()
+        apply_move(played, move)
+        played_eval = minimax(played, depth - 1, not max_player, None)[0]
+
+        before = snapshot(board)
+        best_move = describe_move(before, snapshot(best_board), turn, size=board.rows) if best_board is not None else None
+        loss = max(0.0, (best_eval - played_eval) * sign)
+        results.append({
+            'game': game_id,
+            'ply': ply,
+            'side': 'B' if turn == BLACK else 'W',
+            'move': format_move(move),
+            'eval': round(played_eval, 3),
+            'best_move': format_move(best_move) if best_move else None,
+            'best_eval': round(best_eval, 3),
+            'loss': round(loss, 3),
+            'blunder': loss >= blunder_threshold,
+            'agree': best_board is not None and snapshot(best_board) == snapshot(played),
+        })
+    return game_id, results
+
+
+def iter_games(paths):
+    """Yields (game_id, record) for every game in the corpus, reading files lazily"""
+    for path in paths:
+        for index, record in enumerate(read_records(path)):
+            yield f"{os.path.basename(path)}:{index}", record
+
+
+def load_checkpoint(checkpoint, output):
+    """
+    Returns the ids of games already analyzed
+    The output is truncated to the size it had after the last finished game, dropping partial results
+    """
+    done = set()
+    offset = 0
+    if os.path.exists(checkpoint):
+        with open(checkpoint, encoding='utf-8') as file:
+            for line in file:
+                game_id, _, size = line.rstrip('\n').rpartition('\t')
+                if game_id:
+                    done.add(game_id)
+                    offset = int(size)
+    if os.path.exists(output):
+        with open(output, 'r+b') as file:
+            file.truncate(offset)
+    return done
+
+
+def run(paths, output, checkpoint, depth=DEFAULT_DEPTH, workers=None, blunder_threshold=BLUNDER_THRESHOLD,
+        store_path=None):
+    """Analyzes every game not yet in the checkpoint and streams the results to output (and the store, if given)"""
+    done = load_checkpoint(checkpoint, output)
+    workers = workers or os.cpu_count()
+    games = (game for game in iter_games(paths) if game[0] not in done)
+    analyzed = moves = blunders = agreed = 0
+
+    with ProcessPoolExecutor(workers) as pool, \
+            open(output, 'a', encoding='utf-8') as out, \
+            open(checkpoint, 'a', encoding='utf-8') as ckpt, \
+            (PositionStore(store_path) if store_path else nullcontext()) as store:
+        pending = set()
+        # Future -> record, for adding the game to the store once it is analyzed
+        records = {}
+        exhausted = False
+        while pending or not exhausted:
+            # Keep a bounded number of games in flight so huge corpora are never queued whole
+            while not exhausted and len(pending) < workers * 2:
+                game = next(games, None)
+                if game is None:
+                    exhausted = True
+                else:
+                    future = pool.submit(analyze_game, *game, depth, blunder_threshold)
+                    pending.add(future)
+                    records[future] = game[1]
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                game_id, results = future.result()
+                record = records.pop(future)
+                if store is not None:
+                    store.add_game(record, {result['ply']: (result['best_eval'], depth) for result in results})
+                for result in results:
+                    out.write(json.dumps(result) + '\n')
+                    blunders += result['blunder']
+                    agreed += result['agree']
+                out.flush()
+                # Only mark the game done once its results are safely written
+                ckpt.write(f"{game_id}\t{out.tell()}\n")
+                ckpt.flush()
+                analyzed += 1
+                moves += len(results)
+
+    print(f"Analyzed {analyzed} games, {moves} moves: {blunders} blunders, "
+          f"{agreed / moves * 100 if moves else 0:.1f}% agreement with the engine", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-search every position of recorded games')
+    parser.add_argument('records', nargs='+', help='game record files (.pdn, optionally gzipped)')
+    parser.add_argument('-o', '--output', default='analysis.jsonl', help='JSON lines output file')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.ckpt)')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='search depth per position')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--blunder', type=float, default=BLUNDER_THRESHOLD,
+                        help='evaluation loss that counts as a blunder')
+    parser.add_argument('--store', help='position store to add the analyzed games to')
+    args = parser.parse_args(argv)
+
+    run(args.records, args.output, args.checkpoint or args.output + '.ckpt',
+        depth=args.depth, workers=args.workers, blunder_threshold=args.blunder, store_path=args.store)
+
+
+if __name__ == "__main__":
+    main()
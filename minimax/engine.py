@@ -0,0 +1,176 @@
+"""
+Line-protocol engine process for the minimax search
+
+    python -m minimax.engine
+
+Reads one command per line on stdin and answers on stdout:
+
+    isready                          -> readyok
+    newgame                          reset to a fresh starting position
+    position startpos [moves ...]    random elements, like a new game in the UI
+    position fen <FEN> [moves ...]   FEN and moves as written in game records
+    go [depth N] [movetime MS] [nodes N]
+                                     -> info depth D score S nodes N nps N time MS (per depth)
+                                     -> info string evalcache hits N misses N
+                                     -> info string solved win|loss in N plies nodes N (endgames)
+                                     -> bestmove <move> (or bestmove none)
+    stop                             end the current search and report its best move
+    d                                -> fen <FEN> of the current position
+    quit
+
+Scores are in pieces from the point of view of the side to move. Positions
+reached through "moves" count for the repetition and no-progress draw rules. Searches run
+on a background thread, so stop (and isready and d) are answered while searching. With few
+pieces left the proof-number solver runs first and its move is played when it proves
+a result.
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import sys
+import threading
+from checkers.board import Board
+from checkers.constants import WHITE, BLACK
+from checkers.draws import PositionHistory
+from checkers.record import from_fen, to_fen, parse_move, apply_move, snapshot, describe_move, format_move
+from .algorithm import iterative_deepening, SearchInfo, EVAL_CACHE
+from .pns import solve, is_endgame
+
+# Depth searched by "go" without a depth limit (time or node limits usually stop it first)
+MAX_DEPTH = 64
+
+
+class Engine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.board = Board()
+        self.turn = BLACK
+        self.history = PositionHistory()
+        self.history.push(self.board, self.turn)
+        self.info = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def send(self, line):
+        with self.lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line):
+        """Runs one protocol command; returns False when the engine should exit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'quit':
+            self.stop()
+            return False
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'stop':
+            self.stop()
+        elif command in ('newgame', 'position', 'go', 'd'):
+            # Replacing the position aborts the running search (go stops it itself); d only reads it
+            if command in ('newgame', 'position'):
+                self.stop()
+            try:
+                getattr(self, '_' + command)(args)
+            except (ValueError, IndexError, AttributeError) as error:
+                self.send(f"info string error: {error}")
+        else:
+            self.send(f"info string unknown command: {command}")
+        return True
+
+    def _newgame(self, args):
+        self.board = Board()
+        self.turn = BLACK
+        self.history = PositionHistory()
+        self.history.push(self.board, self.turn)
+
+    def _d(self, args):
+        self.send(f"fen {to_fen(self.board, self.turn)}")
+
+    def _position(self, args):
+        if args[0] == 'startpos':
+            board, turn = Board(), BLACK
+            rest = args[1:]
+        elif args[0] == 'fen':
+            board, turn = from_fen(args[1])
+            rest = args[2:]
+        else:
+            raise ValueError(f"bad position {args[0]!r}")
+
+        history = PositionHistory()
+        history.push(board, turn)
+        if rest:
+            if rest[0] != 'moves':
+                raise ValueError(f"expected 'moves', got {rest[0]!r}")
+            for token in rest[1:]:
+                apply_move(board, parse_move(token))
+                turn = WHITE if turn == BLACK else BLACK
+                history.push(board, turn)
+        self.board, self.turn, self.history = board, turn, history
+
+    def _go(self, args):
+        self.stop()
+        limits = dict(zip(args[::2], args[1::2]))
+        depth = int(limits.get('depth', MAX_DEPTH))
+        movetime = int(limits['movetime']) / 1000 if 'movetime' in limits else None
+        nodes = int(limits['nodes']) if 'nodes' in limits else None
+
+        self.info = SearchInfo(max_nodes=nodes, movetime=movetime, history=self.history.copy())
+        self.thread = threading.Thread(target=self._search, args=(self.board, self.turn, depth, self.info),
+                                       daemon=True)
+        self.thread.start()
+
+    def _search(self, board, turn, depth, info):
+        max_player = turn == WHITE
+        sign = 1 if max_player else -1
+
+        def report(reached, evaluation, best_board):
+            elapsed = info.elapsed()
+            nps = int(info.nodes / elapsed) if elapsed > 0 else 0
+            self.send(f"info depth {reached} score {evaluation * sign:.3f} nodes {info.nodes} "
+                      f"nps {nps} time {int(elapsed * 1000)}")
+
+        if is_endgame(board):
+            solution = solve(board, turn, info)
+            if solution.result is not None:
+                self.send(f"info string solved {solution.result} in {len(solution.line)} plies "
+                          f"nodes {solution.nodes}")
+                # A position that is already decided is proven without a move
+                self._send_bestmove(board, turn, solution.line[0] if solution.line else None)
+                return
+
+        hits, misses = EVAL_CACHE.hits, EVAL_CACHE.misses
+        evaluation, best_board, _ = iterative_deepening(board, depth, max_player, None, info, report)
+        self.send(f"info string evalcache hits {EVAL_CACHE.hits - hits} misses {EVAL_CACHE.misses - misses}")
+        self._send_bestmove(board, turn, best_board)
+
+    def _send_bestmove(self, board, turn, best_board):
+        # A finished game has no moves, and the search then hands back the position itself
+        if best_board is None or best_board is board or board.winner() is not None:
+            self.send('bestmove none')
+        else:
+            move = describe_move(snapshot(board), snapshot(best_board), turn, size=board.rows)
+            self.send(f"bestmove {format_move(move)}")
+
+    def stop(self):
+        """Stops a running search and waits for it to report its best move"""
+        if self.thread is not None:
+            self.info.stopped = True
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    engine = Engine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop()
+
+
+if __name__ == "__main__":
+    main()
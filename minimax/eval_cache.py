@@ -0,0 +1,43 @@
+"""
+Fixed-size cache of static evaluations keyed by Zobrist position hash
+
+Only evaluate() results are stored here; it is separate from any table of
+search results. evaluate() keys it by canonical hash (checkers.symmetry), so a
+position and its color flip share an entry. Each hash maps to one slot and a
+new entry always replaces the old one, which keeps lookups to a single list
+index.
+"""
+
+# Number of slots (a power of two, so a hash is turned into a slot with a mask)
+EVAL_CACHE_SIZE = 1 << 16
+
+
+class EvalCache:
+    def __init__(self, size=EVAL_CACHE_SIZE):
+        if size & (size - 1):
+            raise ValueError(f"cache size must be a power of two, not {size}")
+        self.mask = size - 1
+        # Each slot holds a (hash, evaluation) tuple, so a slot is replaced in one assignment
+        self.slots = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached evaluation for a position hash, or None"""
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, evaluation):
+        self.slots[key & self.mask] = (key, evaluation)
+
+    def clear(self):
+        self.slots = [None] * (self.mask + 1)
+        self.hits = self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,80 @@
+"""
+Move hints for the human player, searched in the background
+
+Hints.request() starts a multi-PV search of the game's position on a worker
+thread and posts a HINTS_READY event when it finishes; results are kept per
+position hash, so going back to a position (or redrawing it) costs nothing.
+"""
+import threading
+from collections import OrderedDict
+import pygame
+from checkers.constants import WHITE
+from checkers.record import snapshot, describe_move
+from checkers.zobrist import position_hash
+from .algorithm import multi_pv, SearchInfo
+
+HINTS_READY = pygame.event.custom_type()
+HINT_LINES = 3
+HINT_DEPTH = 4
+# Positions whose hints are kept
+HINT_CACHE_SIZE = 128
+
+
+class Hints:
+    def __init__(self, lines=HINT_LINES, depth=HINT_DEPTH):
+        self.lines = lines
+        self.depth = depth
+        # position hash -> [(RecordedMove, score for the side to move), ...]
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.info = None
+        self.searching = None
+
+    def get(self, game):
+        """Returns the cached hints for the game's position, or None"""
+        key = position_hash(game.board, game.turn)
+        with self.lock:
+            hints = self.cache.get(key)
+            if hints is not None:
+                self.cache.move_to_end(key)
+            return hints
+
+    def request(self, game):
+        """Returns the hints for the game's position, starting a search for them if they are not cached yet"""
+        hints = self.get(game)
+        key = position_hash(game.board, game.turn)
+        if hints is not None or self.searching == key:
+            return hints
+
+        self.cancel()
+        self.searching = key
+        self.info = SearchInfo(history=game.history.copy())
+        # The search gets its own board: the game's board changes under it as soon as a move is made
+        self.thread = threading.Thread(target=self._search, args=(key, game.board.copy(), game.turn, self.info),
+                                       daemon=True)
+        self.thread.start()
+        return None
+
+    def _search(self, key, board, turn, info):
+        lines = multi_pv(board, self.depth, turn == WHITE, None, self.lines, info)
+        if info.stopped:
+            return
+
+        sign = 1 if turn == WHITE else -1
+        before = snapshot(board)
+        hints = [(describe_move(before, snapshot(line), turn, size=board.rows), evaluation * sign)
+                 for evaluation, line in lines]
+        with self.lock:
+            self.cache[key] = hints
+            if len(self.cache) > HINT_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        pygame.event.post(pygame.event.Event(HINTS_READY, key=key))
+
+    def cancel(self):
+        """Stops a running hint search (e.g. before the AI searches) and waits for it"""
+        if self.thread is not None:
+            self.info.stopped = True
+            self.thread.join()
+            self.thread = None
+            self.searching = None
@@ -0,0 +1,209 @@
+"""
+Depth-first proof-number (df-pn) solver for endgames
+
+solve() tries to prove that the side to move wins, and if that is disproved,
+that it loses. Every node carries a proof number (how many leaves still have
+to be won to prove it) and a disproof number (how many to refute it); the
+search always expands the most-proving node, re-entering a subtree only while
+its numbers stay below the thresholds handed down by its parent. Moves come
+from get_all_moves, so element powers and multi-captures follow the same rules
+as minimax, and positions are won or lost by Board.winner().
+
+Results are kept in a table keyed by Zobrist hash holding at most max_entries
+positions; when it fills up, the half that took the least work to compute is
+dropped. The node budget and any SearchInfo limits abort the solve, so it never
+holds up a turn. Only proofs are trusted: a position drawn by repetition or by
+the no-progress rule (counting the game's history in SearchInfo) or a line
+longer than MAX_PLY counts as "not won", so a failed proof means no result
+rather than a draw.
+"""
+from collections import namedtuple
+from checkers.constants import WHITE, BLACK
+from checkers.draws import PositionHistory, NO_PROGRESS_LIMIT
+from checkers.zobrist import position_hash
+from .algorithm import get_all_moves, SearchInfo, SearchAborted
+
+WIN, LOSS = 'win', 'loss'
+# Positions with this many pieces or fewer are handed to the solver before searching
+SOLVER_PIECES = 6
+# Nodes the solver may expand per move; the win attempt gets half, the loss attempt the rest
+SOLVER_NODES = 8000
+# Positions kept in the proof table
+SOLVER_ENTRIES = 100000
+# Lines longer than this are not followed (and count as not won); a line without progress
+# is drawn sooner, so no proof can be longer than the no-progress rule allows
+MAX_PLY = NO_PROGRESS_LIMIT
+
+INFINITY = 10 ** 9
+# df-pn+ threshold slack: children get a little more than the second-best number, so
+# the search does not bounce between two siblings whose numbers are almost equal
+EPSILON = 0.25
+
+# result is WIN, LOSS or None (not proven); line holds the board after each move of the proven line
+Solution = namedtuple('Solution', ['result', 'line', 'nodes'])
+
+
+class BudgetExhausted(Exception):
+    """Raised inside the solver when a proof attempt has used up its share of nodes"""
+
+
+def is_endgame(board, pieces=SOLVER_PIECES):
+    """Whether a position has few enough pieces left to try the solver"""
+    return board.white_left + board.red_left <= pieces
+
+
+def solve(board, turn, info=None, max_nodes=SOLVER_NODES, max_entries=SOLVER_ENTRIES):
+    """
+    Tries to prove a win or a loss for the side to move
+
+    info is an optional SearchInfo whose stop flag and limits also apply; the
+    solver's nodes are counted on it, and its history (ending with this
+    position) decides which repetitions are draws.
+
+    Returns:
+        Solution: result WIN or LOSS with the line played from here (fastest win,
+                  longest resistance), or None with an empty line
+    """
+    info = info or SearchInfo()
+    history = info.history
+    if history is None:
+        history = PositionHistory()
+        history.push(board, turn)
+    started = info.nodes
+    opponent = WHITE if turn == BLACK else BLACK
+    try:
+        for attacker, result, budget in ((turn, WIN, max_nodes // 2), (opponent, LOSS, max_nodes)):
+            search = ProofSearch(attacker, info, history, started + budget, max_entries)
+            try:
+                if search.prove(board, turn):
+                    return Solution(result, search.line(board, turn), info.nodes - started)
+            except BudgetExhausted:
+                continue
+    except SearchAborted:
+        pass
+    return Solution(None, [], info.nodes - started)
+
+
+class ProofSearch:
+    """One df-pn search proving that attacker wins"""
+
+    def __init__(self, attacker, info, history, node_limit, max_entries=SOLVER_ENTRIES):
+        self.attacker = attacker
+        self.info = info
+        # PositionHistory ending with the position being expanded; pushed and popped like minimax's
+        self.history = history
+        self.node_limit = node_limit
+        self.max_entries = max_entries
+        # position hash -> (proof number, disproof number, work, plies to the end of a proven line)
+        self.table = {}
+
+    def prove(self, board, turn):
+        """Returns True when the attacker is proven to win, False when disproved"""
+        key = position_hash(board, turn)
+        self._mid(board, turn, key, INFINITY - 1, INFINITY - 1, 0)
+        return self.table[key][0] == 0
+
+    def line(self, board, turn):
+        """Follows a proven position to the end: the attacker's fastest win against the longest defence"""
+        line = []
+        for _ in range(MAX_PLY):
+            entry = self.table.get(position_hash(board, turn))
+            if entry is None or entry[0] != 0 or entry[3] == 0:
+                break
+            opponent = WHITE if turn == BLACK else BLACK
+            proven = []
+            for child in get_all_moves(board, turn, None):
+                child_entry = self.table.get(position_hash(child, opponent))
+                if child_entry is not None and child_entry[0] == 0:
+                    proven.append((child_entry[3], child))
+            if not proven:
+                break
+            choose = min if turn == self.attacker else max
+            board = choose(proven, key=lambda item: item[0])[1]
+            line.append(board)
+            turn = opponent
+        return line
+
+    def _lookup(self, key, drawn, ply):
+        """Returns (proof, disproof, plies) of a child position"""
+        if drawn or ply >= MAX_PLY:
+            return INFINITY, 0, 0
+        entry = self.table.get(key)
+        if entry is None:
+            return 1, 1, 0
+        return entry[0], entry[1], entry[3]
+
+    def _store(self, key, proof, disproof, work, plies):
+        self.table[key] = (proof, disproof, work, plies)
+        if len(self.table) > self.max_entries:
+            # Keep the half of the table that was most expensive to compute
+            entries = sorted(self.table.items(), key=lambda item: item[1][2], reverse=True)
+            self.table = dict(entries[:self.max_entries // 2])
+
+    def _visit(self):
+        self.info.visit()
+        if self.info.nodes > self.node_limit:
+            raise BudgetExhausted
+
+    def _mid(self, board, turn, key, proof_limit, disproof_limit, ply):
+        """Expands a position until its proof or disproof number reaches its limit"""
+        self._visit()
+        work_before = self.info.nodes
+        winner = board.winner()
+        if winner is not None:
+            proof, disproof = (0, INFINITY) if winner == self.attacker else (INFINITY, 0)
+            self._store(key, proof, disproof, 1, 0)
+            return
+
+        attacking = turn == self.attacker
+        opponent = WHITE if turn == BLACK else BLACK
+        children = get_all_moves(board, turn, None)
+        history = self.history
+        keys, drawn = [], []
+        for child in children:
+            history.push(child, opponent)
+            keys.append(history.hashes[-1])
+            # Like minimax, a position seen before on this line (or in the game) is a draw
+            drawn.append(history.is_draw(repetition_limit=2))
+            history.pop()
+        try:
+            while True:
+                numbers = [self._lookup(keys[index], drawn[index], ply + 1) for index in range(len(keys))]
+                # At the attacker's turn one winning move proves the node; at the defender's every move must lose
+                if attacking:
+                    proof = min(number[0] for number in numbers)
+                    disproof = min(INFINITY, sum(number[1] for number in numbers))
+                else:
+                    proof = min(INFINITY, sum(number[0] for number in numbers))
+                    disproof = min(number[1] for number in numbers)
+                if proof >= proof_limit or disproof >= disproof_limit:
+                    break
+
+                # The most-proving child: smallest proof number for the attacker, smallest disproof number otherwise
+                side = 0 if attacking else 1
+                order = sorted(range(len(numbers)), key=lambda index: numbers[index][side])
+                best = order[0]
+                second = numbers[order[1]][side] if len(order) > 1 else INFINITY
+                child_proof, child_disproof = numbers[best][0], numbers[best][1]
+                if attacking:
+                    child_proof_limit = min(proof_limit, int(second * (1 + EPSILON)) + 1)
+                    child_disproof_limit = disproof_limit - disproof + child_disproof
+                else:
+                    child_proof_limit = proof_limit - proof + child_proof
+                    child_disproof_limit = min(disproof_limit, int(second * (1 + EPSILON)) + 1)
+                history.push(children[best], opponent)
+                try:
+                    self._mid(children[best], opponent, keys[best], child_proof_limit, child_disproof_limit,
+                              ply + 1)
+                finally:
+                    history.pop()
+        finally:
+            for child in children:
+                child.release()
+
+        plies = 0
+        if proof == 0:
+            # Fastest win for the attacker, longest defence for the defender
+            lengths = [number[2] for number in numbers if number[0] == 0]
+            plies = 1 + (min(lengths) if attacking else max(lengths))
+        self._store(key, proof, disproof, self.info.nodes - work_before + 1, plies)
@@ -0,0 +1,252 @@
+"""
+On-disk index of positions seen in recorded games and self-play
+
+    python -m minimax.position_store build positions.db games.pdn [more.pdn ...] [--self-play N] [--workers N]
+    python -m minimax.position_store query positions.db "<FEN>"
+    python -m minimax.position_store top positions.db [-n 20]
+
+A SQLite table keyed by Zobrist hash (with the side to move) holds every
+distinct position once, with its encoded position, how often it occurred, the
+results of the games it occurred in and the best-known evaluation (from White's
+point of view, kept from the deepest search that reported one). A position and
+its color flip (checkers.symmetry) share one row, stored in the canonical
+orientation; lookups turn the results and evaluation back round. Inserts are
+buffered and written in hash order as one upsert transaction per BATCH_SIZE
+positions, so building stays fast into the tens of millions of rows; the hash
+is the table's rowid, so a lookup is one B-tree descent.
+"""
+import argparse
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from checkers.constants import WHITE, BLACK, DRAW
+from checkers.encoding import encode, decode
+from checkers.record import RESULTS, read_records, from_fen, to_fen
+from checkers.symmetry import canonical_hash, flip_encoded
+from .tuning import play_game
+
+# Distinct positions buffered before they are written
+BATCH_SIZE = 100000
+# SQLite page cache in KiB (negative cache_size values are KiB)
+CACHE_KIB = 256 * 1024
+
+RESULT_COLORS = {token: color for color, token in RESULTS.items()}
+
+PositionStats = namedtuple('PositionStats', ['hash', 'position', 'occurrences', 'white_wins', 'black_wins',
+                                             'draws', 'evaluation', 'depth'])
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS positions (
+    hash INTEGER PRIMARY KEY,
+    position BLOB NOT NULL,
+    occurrences INTEGER NOT NULL,
+    white_wins INTEGER NOT NULL,
+    black_wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    evaluation REAL,
+    depth INTEGER NOT NULL
+)'''
+
+# Counts add up; the evaluation from the deeper search wins
+_UPSERT = '''
+INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (hash) DO UPDATE SET
+    occurrences = occurrences + excluded.occurrences,
+    white_wins = white_wins + excluded.white_wins,
+    black_wins = black_wins + excluded.black_wins,
+    draws = draws + excluded.draws,
+    evaluation = CASE WHEN excluded.depth > depth THEN excluded.evaluation ELSE evaluation END,
+    depth = MAX(depth, excluded.depth)'''
+
+
+def _signed(key):
+    """Maps a 64-bit hash onto SQLite's signed integers"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def _unsigned(key):
+    return key + (1 << 64) if key < 0 else key
+
+
+def canonical_position(board, turn):
+    """Returns (hash, encoded position, flipped) of the canonical orientation of a position"""
+    key, flipped = canonical_hash(board, turn)
+    position = encode(board, turn)
+    return key, flip_encoded(position) if flipped else position, flipped
+
+
+def _flip_result(result):
+    return BLACK if result == WHITE else WHITE if result == BLACK else result
+
+
+def _flip_stats(stats):
+    """The PositionStats of the color flip of a position"""
+    evaluation = -stats.evaluation if stats.evaluation is not None else None
+    return stats._replace(position=flip_encoded(stats.position), white_wins=stats.black_wins,
+                          black_wins=stats.white_wins, evaluation=evaluation)
+
+
+class PositionStore:
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.execute(f'PRAGMA cache_size = {-CACHE_KIB}')
+        self.connection.execute(_SCHEMA)
+        self.batch_size = batch_size
+        # hash -> [position, occurrences, white wins, black wins, draws, evaluation, depth]
+        self.pending = {}
+
+    def add(self, key, position, result=None, evaluation=None, depth=0):
+        """
+        Counts one occurrence of a position; key (its hash) and position must already be in canonical orientation
+        result is WHITE, BLACK, DRAW or None for an unfinished game
+        """
+        row = self.pending.get(key)
+        if row is None:
+            row = self.pending[key] = [position, 0, 0, 0, 0, None, 0]
+        row[1] += 1
+        row[2] += result == WHITE
+        row[3] += result == BLACK
+        row[4] += result == DRAW
+        if evaluation is not None and depth > row[6]:
+            row[5], row[6] = evaluation, depth
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def add_position(self, board, turn, result=None, evaluation=None, depth=0):
+        key, position, flipped = canonical_position(board, turn)
+        if flipped:
+            result = _flip_result(result)
+            evaluation = -evaluation if evaluation is not None else None
+        self.add(key, position, result, evaluation, depth)
+
+    def add_game(self, record, evaluations=None):
+        """
+        Counts every position of a recorded game, the final one included
+        evaluations optionally maps a ply to (evaluation, depth) for the position before that move
+        """
+        result = RESULT_COLORS.get(record.result)
+        evaluations = evaluations or {}
+        board = turn = None
+        for ply, (board, turn, _) in enumerate(record.positions()):
+            self.add_position(board, turn, result, *evaluations.get(ply, (None, 0)))
+        if board is None:
+            board, turn = record.initial_position()
+        else:
+            # positions() has played the last move on the board by now
+            turn = WHITE if turn == BLACK else BLACK
+        self.add_position(board, turn, result)
+
+    def flush(self):
+        """Writes the buffered positions in one transaction"""
+        if not self.pending:
+            return
+        # Hash order keeps the B-tree pages being written close together
+        rows = [(_signed(key), *row) for key, row in sorted(self.pending.items())]
+        with self.connection:
+            self.connection.executemany(_UPSERT, rows)
+        self.pending = {}
+
+    def get(self, key):
+        """Returns the PositionStats for a canonical hash, or None if the position was never added"""
+        self.flush()
+        row = self.connection.execute('SELECT * FROM positions WHERE hash = ?', (_signed(key),)).fetchone()
+        return PositionStats(_unsigned(row[0]), *row[1:]) if row else None
+
+    def lookup(self, board, turn):
+        """Returns the PositionStats of a position, as seen from its own orientation"""
+        key, flipped = canonical_hash(board, turn)
+        stats = self.get(key)
+        return _flip_stats(stats) if stats and flipped else stats
+
+    def most_common(self, limit=20):
+        """Returns the PositionStats of the most frequent positions"""
+        self.flush()
+        rows = self.connection.execute('SELECT * FROM positions ORDER BY occurrences DESC LIMIT ?', (limit,))
+        return [PositionStats(_unsigned(row[0]), *row[1:]) for row in rows]
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _self_play_worker(seed):
+    """Runs in a worker process: returns ([canonical_position()], result) for one self-play game"""
+    positions, result = play_game(seed)
+    return [canonical_position(board, turn) for board, turn in positions], result
+
+
+def build(path, records=(), self_play_games=0, workers=None, seed=0):
+    """Adds recorded games and self-play games to the store at path"""
+    with PositionStore(path) as store:
+        games = 0
+        for record_path in records:
+            for record in read_records(record_path):
+                store.add_game(record)
+                games += 1
+
+        if self_play_games:
+            # Games stopped at the ply limit are unfinished, like records without a result
+            results = {1.0: WHITE, 0.0: BLACK, 0.5: DRAW, None: None}
+            with ProcessPoolExecutor(workers) as pool:
+                for positions, result in pool.map(_self_play_worker, range(seed, seed + self_play_games),
+                                                  chunksize=16):
+                    for key, position, flipped in positions:
+                        store.add(key, position, _flip_result(results[result]) if flipped else results[result])
+                    games += 1
+        print(f"Added {games} games; {len(store)} distinct positions in {path}")
+
+
+def _describe(stats):
+    board, turn = decode(stats.position)
+    evaluation = f"{stats.evaluation:+.3f} (depth {stats.depth})" if stats.evaluation is not None else 'none'
+    return (f"{to_fen(board, turn)}\n    seen {stats.occurrences}x: White {stats.white_wins}, "
+            f"Black {stats.black_wins}, draws {stats.draws}; evaluation {evaluation}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the position store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='add recorded and self-play games')
+    build_parser.add_argument('store')
+    build_parser.add_argument('records', nargs='*', help='game record files (.pdn, optionally gzipped)')
+    build_parser.add_argument('--self-play', type=int, default=0, help='self-play games to add')
+    build_parser.add_argument('--workers', type=int, help='self-play worker processes (default: one per CPU)')
+    build_parser.add_argument('--seed', type=int, default=0)
+
+    query_parser = commands.add_parser('query', help='look up a position by FEN')
+    query_parser.add_argument('store')
+    query_parser.add_argument('fen')
+
+    top_parser = commands.add_parser('top', help='list the most frequent positions')
+    top_parser.add_argument('store')
+    top_parser.add_argument('-n', type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build(args.store, args.records, args.self_play, args.workers, args.seed)
+        return
+
+    with PositionStore(args.store) as store:
+        if args.command == 'query':
+            stats = store.lookup(*from_fen(args.fen))
+            print(_describe(stats) if stats else 'Position not in the store')
+        else:
+            for stats in store.most_common(args.n):
+                print(_describe(stats))
+
+
+if __name__ == "__main__":
+    main()
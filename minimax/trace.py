@@ -0,0 +1,337 @@
+"""
+Search tree traces
+
+    python -m minimax.trace record game.trace "<FEN>" [--depth 4] [--max-ply 3]
+    python -m minimax.trace view game.trace [--search 0] [--path 2.1] [--ply 2] [--summary]
+
+A SearchTrace handed to minimax in SearchInfo(trace=...) streams the explored
+tree into a compact binary file: every node's depth, alpha/beta window, score
+and cutoff flags, and the move leading to it. The game writes one when
+CHECKERS_TRACE names a file (CHECKERS_TRACE_PLY limits how deep it records),
+one search per AI move. Without a trace the search only checks for None, so
+tracing can stay compiled in.
+
+File layout: TRACE_MAGIC, then records, each a tag byte followed by
+
+    SEARCH     FEN length (2 bytes), depth, then the FEN of the root position
+    MOVE       move kind, from and to as PDN square numbers (to the next ENTER)
+    ENTER      remaining depth, alpha and beta (float32)
+    EXIT       flags, futility-pruned moves, score (float32)
+    TRUNCATED  the size limit was reached; nothing follows
+
+A node searched twice (a reduced null-window probe followed by a full re-search)
+shows up as two nodes after the same move; a move followed by no node was
+scored as a draw by repetition without a search.
+"""
+import argparse
+import os
+import struct
+from collections import Counter
+from checkers.constants import WHITE
+from checkers.record import square_number, from_fen, to_fen
+from .algorithm import minimax, SearchInfo, CAPTURE, TERMINAL, CUTOFF
+
+TRACE_MAGIC = b'CKTRACE1'
+TRACE_ENV = 'CHECKERS_TRACE'
+TRACE_PLY_ENV = 'CHECKERS_TRACE_PLY'
+# Bytes a trace file may grow to before recording stops
+MAX_BYTES = 64 * 1024 * 1024
+# Bytes buffered before they are written
+BUFFER_SIZE = 64 * 1024
+
+SEARCH, MOVE, ENTER, EXIT, TRUNCATED = range(1, 6)
+
+# Names of minimax's move kinds (CAPTURE, PROMOTION, POWER, QUIET)
+KIND_NAMES = ('capture', 'promotion', 'power', 'quiet')
+
+_SEARCH = struct.Struct('<BHb')
+_MOVE = struct.Struct('<BBBB')
+_ENTER = struct.Struct('<Bbff')
+_EXIT = struct.Struct('<BBBf')
+
+
+class SearchTrace:
+    """Writes the nodes minimax visits to a trace file, up to max_bytes and max_ply plies deep"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, max_ply=None):
+        self.file = open(path, 'wb')
+        self.file.write(TRACE_MAGIC)
+        self.written = len(TRACE_MAGIC)
+        self.max_bytes = max_bytes
+        self.max_ply = max_ply if max_ply is not None else 255
+        self.buffer = bytearray()
+        self.cols = 0
+        # Ply of the node being searched, -1 between searches
+        self.ply = -1
+        self.truncated = False
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Returns a SearchTrace writing to CHECKERS_TRACE, or None when it is not set"""
+        path = environ.get(TRACE_ENV)
+        if not path:
+            return None
+        ply = environ.get(TRACE_PLY_ENV)
+        return cls(path, max_ply=int(ply) if ply else None)
+
+    def begin(self, board, turn, depth):
+        """Starts the trace of a search from this position"""
+        self.cols = board.cols
+        self.ply = -1
+        fen = to_fen(board, turn).encode('ascii')
+        self._write(_SEARCH.pack(SEARCH, len(fen), depth) + fen)
+
+    def move(self, kind, piece, destination):
+        """Records the move the next node is searched for"""
+        if self.ply < self.max_ply:
+            self._write(_MOVE.pack(MOVE, kind, square_number(piece.row, piece.col, self.cols),
+                                   square_number(*destination, self.cols)))
+
+    def enter(self, depth, alpha, beta):
+        self.ply += 1
+        if self.ply <= self.max_ply:
+            self._write(_ENTER.pack(ENTER, depth, alpha, beta))
+
+    def exit(self, score, flags=0, pruned=0):
+        if self.ply <= self.max_ply:
+            self._write(_EXIT.pack(EXIT, flags, min(pruned, 255), score))
+        self.ply -= 1
+
+    def _write(self, data):
+        if self.truncated:
+            return
+        if self.written + len(self.buffer) + len(data) + 1 > self.max_bytes:
+            self.buffer.append(TRUNCATED)
+            self.truncated = True
+            self.flush()
+            return
+        self.buffer += data
+        if len(self.buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.written += len(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceNode:
+    __slots__ = ('move', 'depth', 'alpha', 'beta', 'score', 'flags', 'pruned', 'children')
+
+    def __init__(self, move=None, depth=None, alpha=None, beta=None):
+        # (kind, from square, to square), None at the root
+        self.move = move
+        self.depth = depth
+        self.alpha = alpha
+        self.beta = beta
+        # None while the node never finished (an aborted or truncated search), or for a repetition draw
+        self.score = None
+        self.flags = 0
+        self.pruned = 0
+        self.children = []
+
+    def count(self):
+        """Number of nodes in this subtree"""
+        return 1 + sum(child.count() for child in self.children)
+
+
+class TracedSearch:
+    def __init__(self, fen, depth):
+        self.fen = fen
+        self.depth = depth
+        # Iterative deepening and multi-PV searches start several times from the root
+        self.roots = []
+        self.truncated = False
+
+
+def read_trace(path):
+    """Returns the TracedSearches of a trace file"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} is not a search trace")
+
+    searches = []
+    search = None
+    # Open nodes from the root down, and the last move recorded below each of them
+    stack, moves = [], []
+    offset = len(TRACE_MAGIC)
+    while offset < len(data):
+        tag = data[offset]
+        if tag == SEARCH:
+            _, length, depth = _SEARCH.unpack_from(data, offset)
+            offset += _SEARCH.size
+            search = TracedSearch(data[offset:offset + length].decode('ascii'), depth)
+            searches.append(search)
+            offset += length
+            stack, moves = [], []
+        elif tag == MOVE:
+            _, kind, start, end = _MOVE.unpack_from(data, offset)
+            offset += _MOVE.size
+            _close_move(stack, moves)
+            moves[-1] = [(kind, start, end), False]
+        elif tag == ENTER:
+            _, depth, alpha, beta = _ENTER.unpack_from(data, offset)
+            offset += _ENTER.size
+            if search is None:
+                search = TracedSearch(None, depth)
+                searches.append(search)
+            if stack:
+                move = moves[-1]
+                move[1] = True
+                node = TraceNode(move[0], depth, alpha, beta)
+                stack[-1].children.append(node)
+            else:
+                node = TraceNode(None, depth, alpha, beta)
+                search.roots.append(node)
+            stack.append(node)
+            moves.append([None, True])
+        elif tag == EXIT:
+            _, flags, pruned, score = _EXIT.unpack_from(data, offset)
+            offset += _EXIT.size
+            _close_move(stack, moves)
+            node = stack.pop()
+            moves.pop()
+            node.score, node.flags, node.pruned = score, flags, pruned
+        elif tag == TRUNCATED:
+            if search is not None:
+                search.truncated = True
+            break
+        else:
+            raise ValueError(f"Corrupt trace record at byte {offset}")
+    return searches
+
+
+def _close_move(stack, moves):
+    """Adds the last move below the innermost node as a draw when no node was searched for it"""
+    if stack and not moves[-1][1]:
+        stack[-1].children.append(TraceNode(moves[-1][0]))
+        moves[-1][1] = True
+
+
+def format_move(move):
+    if move is None:
+        return 'root'
+    kind, start, end = move
+    return f"{start}{'x' if kind == CAPTURE else '-'}{end}"
+
+
+def describe(node, parent=None):
+    """One line about a node: move, depth, window, score and flags"""
+    if node.depth is None:
+        return f"{format_move(node.move):8} draw by repetition"
+    notes = []
+    if node.move is not None:
+        notes.append(KIND_NAMES[node.move[0]])
+    if parent is not None and parent.depth is not None and node.depth < parent.depth - 1:
+        notes.append('reduced')
+    if node.flags & CUTOFF:
+        notes.append('cutoff')
+    if node.flags & TERMINAL:
+        notes.append('game over')
+    if node.pruned:
+        notes.append(f"{node.pruned} pruned")
+    score = f"{node.score:+.3f}" if node.score is not None else 'unfinished'
+    best = '*' if parent is not None and node.score is not None and node.score == parent.score else ' '
+    return (f"{best}{format_move(node.move):8} d{node.depth} [{node.alpha:+.3f}, {node.beta:+.3f}] "
+            f"-> {score}  {', '.join(notes)}")
+
+
+def print_tree(node, plies, parent=None, indent=''):
+    print(indent + describe(node, parent))
+    if plies > 0:
+        for child in node.children:
+            print_tree(child, plies - 1, node, indent + '  ')
+    elif node.children:
+        below = node.count() - 1
+        print(f"{indent}  ... {below} node{'s' if below != 1 else ''} below")
+
+
+def summarize(search):
+    """Prints nodes, cutoffs and first-move cutoffs per ply, the usual measure of move ordering"""
+    nodes, cutoffs, recorded, first = Counter(), Counter(), Counter(), Counter()
+    pending = [(root, 0) for root in search.roots]
+    while pending:
+        node, ply = pending.pop()
+        if node.depth is None:
+            continue
+        nodes[ply] += 1
+        if node.flags & CUTOFF:
+            cutoffs[ply] += 1
+            # At the recording limit (--max-ply) a node's moves were not recorded, so its cutoff can't be judged
+            if node.children:
+                recorded[ply] += 1
+                searched = [child for child in node.children if child.depth is not None]
+                first[ply] += len(searched) == 1
+        pending.extend((child, ply + 1) for child in node.children)
+    print(f"{'ply':>4} {'nodes':>9} {'cutoffs':>9} {'first move':>11}")
+    for ply in sorted(nodes):
+        rate = f"{first[ply] / recorded[ply] * 100:.0f}%" if recorded[ply] else '-'
+        print(f"{ply:4} {nodes[ply]:9} {cutoffs[ply]:9} {rate:>11}")
+
+
+def record(path, fen, depth, max_ply=None):
+    """Searches a position with tracing on"""
+    board, turn = from_fen(fen)
+    with SearchTrace(path, max_ply=max_ply) as trace:
+        trace.begin(board, turn, depth)
+        info = SearchInfo(trace=trace)
+        score, _ = minimax(board, depth, turn == WHITE, None, info=info)
+    print(f"Searched {info.nodes} nodes (score {score:+.3f}); wrote {os.path.getsize(path)} bytes to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record and browse search tree traces')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='trace the search of a position')
+    record_parser.add_argument('trace')
+    record_parser.add_argument('fen')
+    record_parser.add_argument('--depth', type=int, default=4)
+    record_parser.add_argument('--max-ply', type=int, help='deepest ply to record')
+
+    view_parser = commands.add_parser('view', help='browse a trace')
+    view_parser.add_argument('trace')
+    view_parser.add_argument('--search', type=int, help='search to show (default: list them)')
+    view_parser.add_argument('--path', default='', help='child numbers leading to the node to show, e.g. 2.1')
+    view_parser.add_argument('--ply', type=int, default=1, help='plies to show below the node')
+    view_parser.add_argument('--summary', action='store_true', help='show nodes and cutoffs per ply')
+
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        record(args.trace, args.fen, args.depth, args.max_ply)
+        return
+
+    searches = read_trace(args.trace)
+    if args.search is None and len(searches) != 1:
+        for index, search in enumerate(searches):
+            nodes = sum(root.count() for root in search.roots)
+            print(f"{index:4}  depth {search.depth}  {nodes:8} nodes{'  truncated' if search.truncated else ''}"
+                  f"  {search.fen}")
+        return
+
+    search = searches[args.search or 0]
+    print(f"{search.fen}  depth {search.depth}{'  (truncated)' if search.truncated else ''}")
+    if args.summary:
+        summarize(search)
+        return
+    for root in search.roots:
+        node, parent = root, None
+        for number in filter(None, args.path.split('.')):
+            parent, node = node, node.children[int(number) - 1]
+        print_tree(node, args.ply, parent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Evaluation weight tuning (Texel method)
+
+    python -m minimax.tuning generate --games 20000 -o positions.npz [--workers N]
+    python -m minimax.tuning fit positions.npz [more.npz ...] [-o minimax/weights.json]
+
+generate plays self-play games across worker processes and stores the
+evaluation_features of every quiet position (no capture available) together with
+the game's result for White: 1 win, 0 loss, 0.5 draw or unfinished.
+
+fit minimizes the logistic loss of sigmoid(K * features . weights) against those
+results with vectorized minibatch gradient steps. K is fitted first with the
+current weights, and the tuned weights are rescaled so a man stays worth 1.0,
+keeping scores in piece units. The weights file is loaded by evaluate() at startup.
+"""
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from checkers.board import Board
+from checkers.constants import WHITE, BLACK
+from checkers.draws import PositionHistory
+from .algorithm import get_all_moves, evaluate, evaluation_features, FEATURES, WEIGHTS, WEIGHTS_FILE
+
+# Chance of a random move instead of the greedy one, to diversify self-play
+EXPLORATION = 0.2
+# Games still running after this many plies are stopped unfinished (repetitions and the no-progress rule end most
+# earlier)
+MAX_PLIES = 200
+
+LEARNING_RATE = 0.5
+EPOCHS = 20
+BATCH_SIZE = 65536
+L2 = 1e-6
+
+
+def _is_quiet(board, color):
+    """Returns True if the side to move has no capture available"""
+    for piece in board.get_all_pieces(color):
+        for skipped in board.get_valid_moves(piece).values():
+            if skipped and not isinstance(skipped[-1], str):
+                return False
+    return True
+
+
+def play_game(seed, exploration=EXPLORATION, max_plies=MAX_PLIES):
+    """
+    Plays one greedy-with-noise self-play game
+
+    Returns:
+        tuple: ([(board, turn)] for every position of the game, the final one included,
+                result for White: 1.0, 0.0, 0.5 for a draw or None when stopped after max_plies)
+    """
+    random.seed(seed)  # Board() draws the element assignment from the global generator
+    rng = random.Random(seed)
+    board, turn = Board(), BLACK
+    history = PositionHistory()
+    history.push(board, turn)
+    positions = []
+    result = None
+
+    for ply in range(max_plies + 1):
+        positions.append((board, turn))
+        winner = board.winner()
+        if winner is not None:
+            result = 1.0 if winner == WHITE else 0.0
+            break
+        if history.is_draw():
+            result = 0.5
+            break
+        moves = get_all_moves(board, turn, None)
+        if not moves:
+            result = 0.0 if turn == WHITE else 1.0
+            break
+        if ply == max_plies:
+            break
+
+        if rng.random() < exploration:
+            board = rng.choice(moves)
+        elif turn == WHITE:
+            board = max(moves, key=evaluate)
+        else:
+            board = min(moves, key=evaluate)
+        turn = WHITE if turn == BLACK else BLACK
+        history.push(board, turn)
+
+    return positions, result
+
+
+def self_play(seed, exploration=EXPLORATION, max_plies=MAX_PLIES):
+    """Plays one self-play game and returns (features, results) arrays for its quiet positions"""
+    positions, result = play_game(seed, exploration, max_plies)
+    # The final position has no move played from it; an unfinished game counts as a draw
+    quiet = [evaluation_features(board) for board, turn in positions[:-1] if _is_quiet(board, turn)]
+    features = np.array(quiet, dtype=np.float32).reshape(-1, len(FEATURES))
+    return features, np.full(len(features), 0.5 if result is None else result, dtype=np.float32)
+
+
+def generate(games, output, workers=None, seed=0):
+    """Runs self-play games in parallel and saves the features and results to an .npz file"""
+    features, results = [], []
+    with ProcessPoolExecutor(workers) as pool:
+        for game_features, game_results in pool.map(self_play, range(seed, seed + games), chunksize=16):
+            features.append(game_features)
+            results.append(game_results)
+    features = np.concatenate(features)
+    results = np.concatenate(results)
+    np.savez_compressed(output, features=features, results=results, names=np.array(FEATURES))
+    print(f"Saved {len(features)} positions from {games} games to {output}")
+
+
+def load_positions(paths):
+    """Loads and concatenates (features, results) from .npz files written by generate"""
+    features, results = [], []
+    for path in paths:
+        with np.load(path) as data:
+            if list(data['names']) != FEATURES:
+                raise ValueError(f"{path} was generated for different evaluation features")
+            features.append(data['features'])
+            results.append(data['results'])
+    return np.concatenate(features).astype(np.float64), np.concatenate(results).astype(np.float64)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -500, 500)))
+
+
+def logistic_loss(features, results, weights, k):
+    """Mean cross-entropy between sigmoid(k * score) and the game results"""
+    predicted = np.clip(_sigmoid(k * (features @ weights)), 1e-12, 1 - 1e-12)
+    return float(-np.mean(results * np.log(predicted) + (1 - results) * np.log(1 - predicted)))
+
+
+def fit_scale(features, results, weights, low=0.01, high=10.0, iterations=60):
+    """Finds the K that best maps scores of the given weights to results (golden-section search)"""
+    ratio = (5 ** 0.5 - 1) / 2
+    for _ in range(iterations):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if logistic_loss(features, results, weights, a) < logistic_loss(features, results, weights, b):
+            high = b
+        else:
+            low = a
+    return (low + high) / 2
+
+
+def fit(features, results, weights, k, learning_rate=LEARNING_RATE, epochs=EPOCHS, batch_size=BATCH_SIZE,
+        l2=L2, seed=0):
+    """Returns weights fitted by minibatch gradient descent on the logistic loss"""
+    # Gradient steps work on standardized features so every term learns at a similar rate
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    scaled = features / scale
+    scaled_weights = weights * scale
+    rng = np.random.default_rng(seed)
+
+    for epoch in range(epochs):
+        order = rng.permutation(len(scaled))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            error = _sigmoid(k * (scaled[batch] @ scaled_weights)) - results[batch]
+            gradient = k * (scaled[batch].T @ error) / len(batch) + l2 * scaled_weights
+            scaled_weights -= learning_rate * gradient
+        print(f"epoch {epoch + 1}: loss {logistic_loss(scaled, results, scaled_weights, k):.6f}")
+
+    return scaled_weights / scale
+
+
+def tune(paths, output=WEIGHTS_FILE, **options):
+    features, results = load_positions(paths)
+    initial = np.array([WEIGHTS[name] for name in FEATURES])
+    k = fit_scale(features, results, initial)
+    print(f"{len(features)} positions, K = {k:.4f}, initial loss {logistic_loss(features, results, initial, k):.6f}")
+
+    weights = fit(features, results, initial, k, **options)
+    # Keep scores in piece units: a man is worth 1.0
+    men = FEATURES.index('men')
+    if weights[men] > 0:
+        weights = weights / weights[men]
+
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({name: round(float(weight), 6) for name, weight in zip(FEATURES, weights)}, file, indent=2)
+        file.write('\n')
+    for name, weight in zip(FEATURES, weights):
+        print(f"{name:>20}: {WEIGHTS[name]:8.4f} -> {weight:8.4f}")
+    print(f"Wrote {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tune evaluation weights from self-play')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='play self-play games and save position features')
+    generate_parser.add_argument('--games', type=int, default=1000)
+    generate_parser.add_argument('-o', '--output', default='positions.npz')
+    generate_parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    fit_parser = commands.add_parser('fit', help='fit weights to saved positions')
+    fit_parser.add_argument('positions', nargs='+', help='.npz files written by generate')
+    fit_parser.add_argument('-o', '--output', default=WEIGHTS_FILE)
+    fit_parser.add_argument('--epochs', type=int, default=EPOCHS)
+    fit_parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+    fit_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        generate(args.games, args.output, args.workers, args.seed)
+    else:
+        tune(args.positions, args.output, epochs=args.epochs, learning_rate=args.learning_rate,
+             batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
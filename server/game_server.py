@@ -0,0 +1,258 @@
+"""
+Asyncio server hosting many concurrent Elemental Checkers games
+
+    python -m server.game_server [--port 8765 | --unix /tmp/checkers.sock] [--workers N]
+
+Clients send one JSON object per line and get one JSON line back per request,
+echoing the request's "id" so a connection can drive many games at once:
+
+    {"cmd": "new", "ai": "W", "depth": 3, "movetime": 0.2, "budget": 30, "size": 10}
+    {"cmd": "move", "game": 1, "move": "22-17"}       (start == end uses fire power)
+    {"cmd": "earth", "game": 1, "use": true}          answer a pending earth power choice
+    {"cmd": "state", "game": 1}
+    {"cmd": "close", "game": 1}
+    {"cmd": "stats"}
+
+Moves are checked with the same Game rules as the pygame UI, including the
+repetition and no-progress draws ("winner": "draw"). AI turns run on a
+bounded process pool; each game has a per-move time limit and a total time
+budget (both in seconds), after which its AI only searches depth 1. When too many AI searches are
+queued the server stops reading further requests, pushing back on clients.
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from checkers.constants import ROWS, BOARD_SIZES, WHITE, BLACK, DRAW
+from checkers.encoding import encode, decode
+from checkers.game import Game
+from checkers.record import to_fen, square_number, square_coords
+from minimax.algorithm import iterative_deepening, SearchInfo
+
+DEFAULT_PORT = 8765
+MAX_GAMES = 1000
+# AI searches allowed to wait for a worker, per worker process
+QUEUE_PER_WORKER = 4
+# Requests a single connection may have in progress before the server stops reading it
+MAX_REQUESTS_PER_CONNECTION = 256
+
+DEFAULT_DEPTH = 3
+DEFAULT_MOVETIME = 0.5
+DEFAULT_BUDGET = 60.0
+
+COLORS = {'B': BLACK, 'W': WHITE}
+COLOR_NAMES = {BLACK: 'B', WHITE: 'W'}
+WINNER_NAMES = dict(COLOR_NAMES, **{DRAW: 'draw'})
+
+
+def search_worker(position, depth, movetime, history=None):
+    """Runs in a worker process: returns the encoded position after the best move and the time spent"""
+    board, turn = decode(position)
+    info = SearchInfo(movetime=movetime, history=history)
+    _, best_board, _ = iterative_deepening(board, depth, turn == WHITE, None, info)
+    next_turn = WHITE if turn == BLACK else BLACK
+    return encode(best_board, next_turn), info.elapsed()
+
+
+class RequestError(Exception):
+    """A request the server refuses; the message is sent back to the client"""
+
+
+class GameSession:
+    def __init__(self, game_id, ai_color, depth, movetime, budget, size=ROWS):
+        self.id = game_id
+        self.game = Game(None, size)
+        self.ai_color = ai_color
+        self.depth = depth
+        self.movetime = movetime
+        self.budget = budget
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        game = self.game
+        winner = game.winner()
+        return {
+            'ok': True,
+            'game': self.id,
+            'fen': to_fen(game.board, game.turn),
+            'turn': COLOR_NAMES[game.turn],
+            'winner': WINNER_NAMES.get(winner),
+            'earth_pending': game.earth_power_active,
+            'budget': round(self.budget, 3),
+            'legal': [] if winner is not None else
+            [f"{square_number(*start, game.board.cols)}-{square_number(*end, game.board.cols)}"
+             for start, end in game.selectable_moves()],
+        }
+
+
+class GameServer:
+    def __init__(self, workers=None, max_games=MAX_GAMES):
+        workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(workers)
+        self.ai_slots = asyncio.Semaphore(workers * QUEUE_PER_WORKER)
+        self.max_games = max_games
+        self.games = {}
+        self.next_id = 1
+        self.ai_waiting = 0
+        self.ai_moves = 0
+
+    async def handle_client(self, reader, writer):
+        in_flight = asyncio.Semaphore(MAX_REQUESTS_PER_CONNECTION)
+        tasks = set()
+        try:
+            while True:
+                # Waiting here is the backpressure: a busy connection is not read any further
+                await in_flight.acquire()
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    line = b''
+                if not line:
+                    in_flight.release()
+                    break
+                task = asyncio.create_task(self._serve(line, writer, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _serve(self, line, writer, in_flight):
+        request = {}
+        try:
+            request = json.loads(line)
+            response = await self.dispatch(request)
+        except RequestError as error:
+            response = {'ok': False, 'error': str(error)}
+        except (ValueError, KeyError, TypeError) as error:
+            response = {'ok': False, 'error': f"bad request: {error}"}
+        except Exception as error:
+            # One broken game must not take the connection (and its other games) down
+            response = {'ok': False, 'error': f"internal error: {error!r}"}
+        finally:
+            in_flight.release()
+
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+        writer.write(json.dumps(response).encode() + b'\n')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, request):
+        command = request['cmd']
+        if command == 'new':
+            return await self._new(request)
+        if command == 'stats':
+            return {'ok': True, 'games': len(self.games), 'ai_waiting': self.ai_waiting, 'ai_moves': self.ai_moves}
+
+        session = self.games.get(request.get('game'))
+        if session is None:
+            raise RequestError(f"no game {request.get('game')!r}")
+        if command == 'close':
+            del self.games[session.id]
+            return {'ok': True, 'game': session.id}
+
+        async with session.lock:
+            if command == 'state':
+                return session.state()
+            if session.game.winner() is not None:
+                raise RequestError('game is over')
+            if command == 'move':
+                self._move(session, request['move'])
+            elif command == 'earth':
+                if not session.game.handle_earth_power_choice(bool(request['use'])):
+                    raise RequestError('no earth power choice pending')
+            else:
+                raise RequestError(f"unknown command {command!r}")
+            await self._play_ai(session)
+            return session.state()
+
+    async def _new(self, request):
+        if len(self.games) >= self.max_games:
+            raise RequestError('server is full')
+        ai = request.get('ai')
+        if ai is not None and ai not in COLORS:
+            raise RequestError(f"ai must be 'B', 'W' or null, not {ai!r}")
+        size = int(request.get('size', ROWS))
+        if size not in BOARD_SIZES:
+            raise RequestError(f"size must be one of {', '.join(map(str, BOARD_SIZES))}, not {size}")
+        session = GameSession(self.next_id, COLORS.get(ai), int(request.get('depth', DEFAULT_DEPTH)),
+                              float(request.get('movetime', DEFAULT_MOVETIME)),
+                              float(request.get('budget', DEFAULT_BUDGET)), size)
+        self.next_id += 1
+        self.games[session.id] = session
+        async with session.lock:
+            await self._play_ai(session)
+            return session.state()
+
+    def _move(self, session, token):
+        if session.game.turn == session.ai_color:
+            raise RequestError('it is the AI to move')
+        separator = 'x' if 'x' in token else '-'
+        start, end = (square_coords(int(square), session.game.board.cols) for square in token.split(separator))
+        if not session.game.play(start, end):
+            raise RequestError(f"illegal move {token}")
+
+    async def _play_ai(self, session):
+        """Lets the AI move for as long as it is its turn"""
+        game = session.game
+        while game.turn == session.ai_color and game.winner() is None and not game.earth_power_active:
+            # Once the game's time budget is spent the AI only looks one move ahead
+            if session.budget > 0:
+                depth, movetime = session.depth, min(session.movetime, session.budget)
+            else:
+                depth, movetime = 1, None
+
+            self.ai_waiting += 1
+            try:
+                async with self.ai_slots:
+                    loop = asyncio.get_running_loop()
+                    position, elapsed = await loop.run_in_executor(
+                        self.pool, search_worker, encode(game.board, game.turn), depth, movetime, game.history)
+            finally:
+                self.ai_waiting -= 1
+
+            session.budget -= elapsed
+            game.ai_move(decode(position)[0])
+            self.ai_moves += 1
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, unix=None, workers=None, max_games=MAX_GAMES):
+    game_server = GameServer(workers, max_games)
+    if unix:
+        server = await asyncio.start_unix_server(game_server.handle_client, path=unix)
+    else:
+        server = await asyncio.start_server(game_server.handle_client, host, port)
+    print(f"Serving on {unix or f'{host}:{port}'}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host many Elemental Checkers games over a socket')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on a unix socket at this path instead of TCP')
+    parser.add_argument('--workers', type=int, help='AI worker processes (default: one per CPU)')
+    parser.add_argument('--max-games', type=int, default=MAX_GAMES)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.max_games))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
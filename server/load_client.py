@@ -0,0 +1,130 @@
+"""
+Load test client for the game server
+
+    python -m server.load_client --games 300 --connections 10 [--port 8765 | --unix PATH]
+
+Plays many games at once against the server's AI, choosing random legal moves
+for the human side, and reports games and moves per second and request latency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from .game_server import DEFAULT_PORT
+
+# Games still running after this many plies are abandoned
+MAX_PLIES = 300
+
+
+class Connection:
+    """One socket to the server with requests matched to responses by id"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.latencies = []
+        self.listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def open(cls, host, port, unix):
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, **request):
+        self.next_id += 1
+        request['id'] = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        started = time.perf_counter()
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        response = await future
+        self.latencies.append(time.perf_counter() - started)
+        return response
+
+    async def _listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+
+async def play_game(connection, rng, depth, movetime):
+    """Plays one game as Black against the AI; returns (moves made, finished)"""
+    state = await connection.request(cmd='new', ai='W', depth=depth, movetime=movetime)
+    if not state['ok']:
+        raise RuntimeError(state['error'])
+    game_id = state['game']
+    moves = 0
+    while state['winner'] is None and moves < MAX_PLIES:
+        if state['earth_pending']:
+            state = await connection.request(cmd='earth', game=game_id, use=rng.random() < 0.5)
+        elif state['legal']:
+            state = await connection.request(cmd='move', game=game_id, move=rng.choice(state['legal']))
+        else:
+            break
+        if not state['ok']:
+            raise RuntimeError(state['error'])
+        moves += 1
+    await connection.request(cmd='close', game=game_id)
+    return moves, state['winner'] is not None
+
+
+async def run(games, connections, host, port, unix, depth, movetime, seed):
+    links = [await Connection.open(host, port, unix) for _ in range(connections)]
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(play_game(links[index % connections], random.Random(rng.random()), depth, movetime)
+                                     for index in range(games)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    played = [result for result in results if not isinstance(result, Exception)]
+    moves = sum(result[0] for result in played)
+    finished = sum(result[1] for result in played)
+    latencies = sorted(latency for link in links for latency in link.latencies)
+    for link in links:
+        await link.close()
+
+    print(f"{len(played)} games ({finished} finished, {len(errors)} failed) in {elapsed:.1f}s: "
+          f"{len(played) / elapsed:.2f} games/s, {moves / elapsed:.1f} moves/s")
+    if latencies:
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        print(f"request latency: p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, "
+              f"p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    for error in errors[:5]:
+        print(f"error: {error!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive many simultaneous games against the game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='connect to a unix socket instead of TCP')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=2, help='AI search depth')
+    parser.add_argument('--movetime', type=float, default=0.1, help='AI seconds per move')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.games, args.connections, args.host, args.port, args.unix,
+                    args.depth, args.movetime, args.seed))
+
+
+if __name__ == "__main__":
+    main()